@@ -0,0 +1,239 @@
+"""
+End-to-end benchmark: MCP_ChatBot.process_query against the real research
+and weather servers (over stdio, as in normal use), with scripted mock
+Gemini responses and local stubs standing in for ArXiv and AccuWeather.
+Nothing leaves the machine and no API keys are needed.
+
+Runs in its own process (see run_e2e), so peak RSS covers one run:
+
+    python -m benchmarks.e2e --queries 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Set, Tuple
+
+from benchmarks.report import children_peak_rss_mb, latency_stats, peak_rss_mb
+from benchmarks.stubs import UpstreamStubs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_CONFIG = os.path.join(ROOT, "utils", "server_config.json")
+
+DEFAULT_QUERIES = 200
+DEFAULT_CONCURRENCY = 8
+DEFAULT_POOL_SIZE = 2
+# Seconds the stubs take per upstream request, and between mock model chunks
+DEFAULT_UPSTREAM_LATENCY = 0.02
+DEFAULT_LLM_CHUNK_DELAY = 0.0
+SEED = 1234
+
+TOPICS = ["graph neural networks", "diffusion models", "reinforcement learning", "protein folding",
+          "speech recognition", "federated learning", "quantum error correction", "program synthesis"]
+CITIES = ["Paris", "Tokyo", "Lagos", "Lima", "Oslo", "Delhi", "Austin", "Sydney"]
+
+FINAL_ANSWER = (
+    "Here is a summary of what the tools returned. The results cover the main points of "
+    "your question, with the most relevant items first and a short note on each one. "
+    "Let me know if you would like more detail on any of them."
+)
+FOLLOW_UP_PREFIXES = ("Based on the tool result", "There was an error with the tool call")
+# A failed tool call's result line in the history, labelled with the tool when a turn has several
+TOOL_ERROR_LINE = re.compile(r"^Tool result: (?:\[\w+\] )?Error: ", re.MULTILINE)
+# Follow-up prompts quote the query they answer
+FOLLOW_UP_QUERY = re.compile(r"original (?:query|question): '(.*?)'")
+
+
+def _tool_call(tool_name: str, **tool_args) -> Dict:
+    return {"action": "tool_call", "tool_name": tool_name, "tool_args": tool_args}
+
+
+def build_workload(count: int, seed: int = SEED) -> List[Tuple[str, List[Dict]]]:
+    """
+    Queries paired with the tool calls the mock model answers them with:
+    ArXiv searches, local lookups, single and parallel weather requests.
+    Searches come first so later lookups find saved papers.
+    """
+    rng = random.Random(seed)
+    workload = [(f"Find recent papers about {topic} [{i}]", [_tool_call("search_papers", topic=topic, max_results=5)])
+                for i, topic in enumerate(TOPICS)]
+    while len(workload) < count:
+        i = len(workload)
+        kind = i % 5
+        if kind == 0:
+            topic = rng.choice(TOPICS)
+            query, calls = f"Find papers about {topic} [{i}]", [_tool_call("search_papers", topic=topic, max_results=5)]
+        elif kind == 1:
+            city = rng.choice(CITIES)
+            query, calls = f"What's the weather in {city}? [{i}]", [_tool_call("get_hourly_weather", location=city)]
+        elif kind == 2:
+            query = f"Compare the weather in two cities [{i}]"
+            calls = [_tool_call("get_hourly_weather", location=city) for city in rng.sample(CITIES, 2)]
+        elif kind == 3:
+            query, calls = f"List my saved papers [{i}]", [_tool_call("list_saved_papers", limit=20)]
+        else:
+            topic = rng.choice(TOPICS)
+            query = f"Which saved papers discuss {topic}? [{i}]"
+            calls = [_tool_call("search_local_papers", query=topic, k=5)]
+        workload.append((query, calls))
+    return workload[:count]
+
+
+def make_responder(workload: List[Tuple[str, List[Dict]]], chunk_delay: float, tool_errors: Set[str]):
+    """
+    Mock model: a workload query gets its scripted tool calls, a follow-up
+    after tool results gets the final answer. Queries whose tool results
+    include an error (or timeout) are added to `tool_errors`; each query runs
+    in a conversation of its own, so every tool result in a follow-up
+    prompt belongs to the query it quotes.
+    """
+    scripted = {query: json.dumps(calls[0] if len(calls) == 1 else calls) for query, calls in workload}
+
+    def responder(prompt: str) -> Optional[Dict]:
+        start = prompt.rfind("\nUser: ")
+        current = prompt[start + len("\nUser: "):] if start >= 0 else prompt
+        if current.startswith(FOLLOW_UP_PREFIXES):
+            if TOOL_ERROR_LINE.search(prompt):
+                quoted = FOLLOW_UP_QUERY.search(current)
+                tool_errors.add(quoted.group(1) if quoted else current)
+            return {"response": FINAL_ANSWER, "chunk_delay": chunk_delay}
+        query = current[:-len("\nAssistant:")] if current.endswith("\nAssistant:") else current
+        if query in scripted:
+            return {"response": scripted[query], "chunk_delay": chunk_delay}
+        return None
+
+    return responder
+
+
+def write_config(path: str, stubs: UpstreamStubs, scratch: str):
+    """Server config starting both servers against the stubs, with all state under scratch."""
+    with open(SERVER_CONFIG, "r", encoding="utf-8") as f:
+        tool_cache = json.load(f).get("toolCache", {})
+    common = {"HOME": scratch, "PYTHONDONTWRITEBYTECODE": "1"}
+    config = {
+        "mcpServers": {
+            "research": {
+                "command": sys.executable,
+                "args": [os.path.join(ROOT, "research_server.py")],
+                "env": {
+                    **common,
+                    "RESEARCH_PAPER_DIR": os.path.join(scratch, "papers"),
+                    "ARXIV_API_URL": stubs.arxiv_url,
+                    # The stub has no rate limit to respect
+                    "ARXIV_REQUESTS_PER_SECOND": "10000",
+                    "ARXIV_BURST": "10000",
+                },
+            },
+            "weather": {
+                "command": sys.executable,
+                "args": [os.path.join(ROOT, "weather_server.py")],
+                "env": {
+                    **common,
+                    "ACCUWEATHER_API_KEY": "benchmark",
+                    "ACCUWEATHER_BASE_URL": stubs.accuweather_url,
+                    "ACCUWEATHER_QUOTA_PER_DAY": "1000000000",
+                },
+            },
+        },
+        "toolCache": tool_cache,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+async def run(queries: int = DEFAULT_QUERIES, concurrency: int = DEFAULT_CONCURRENCY,
+              pool_size: int = DEFAULT_POOL_SIZE, upstream_latency: float = DEFAULT_UPSTREAM_LATENCY,
+              chunk_delay: float = DEFAULT_LLM_CHUNK_DELAY) -> Dict:
+    from mcp_chatbot import MCP_ChatBot
+    from utils.batch_runner import run_batch
+
+    workload = build_workload(queries)
+    stubs = UpstreamStubs(latency=upstream_latency)
+    await stubs.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-e2e-") as scratch:
+            config_path = os.path.join(scratch, "server_config.json")
+            input_path = os.path.join(scratch, "queries.jsonl")
+            output_path = os.path.join(scratch, "results.jsonl")
+            write_config(config_path, stubs, scratch)
+            with open(input_path, "w", encoding="utf-8") as f:
+                for query, _ in workload:
+                    f.write(json.dumps({"query": query}) + "\n")
+
+            tool_errors: Set[str] = set()
+            tool_cache = {"hits": 0, "misses": 0}
+            chatbot = MCP_ChatBot(mock_mode=True, verbose=False)
+            chatbot.gemini_client.set_mock_responder(make_responder(workload, chunk_delay, tool_errors))
+
+            async def process_query(query: str) -> str:
+                # As in batch mode: every query gets a conversation, and tool cache, of its own
+                conversation = chatbot.new_conversation()
+                try:
+                    return await conversation.process_query(query)
+                finally:
+                    stats = conversation.tool_cache.stats()
+                    tool_cache["hits"] += stats["hits"]
+                    tool_cache["misses"] += stats["misses"]
+
+            try:
+                await chatbot.connect_to_servers(config_path, pool_size=pool_size)
+                if len(chatbot.connections) < 2:
+                    raise RuntimeError("Could not start both the research and weather servers")
+                with open(output_path, "w", encoding="utf-8") as output:
+                    summary = await run_batch(process_query, input_path, output, concurrency)
+            finally:
+                await chatbot.cleanup()
+
+            with open(output_path, "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+    finally:
+        await stubs.stop()
+
+    unanswered = sum(1 for r in records
+                     if "error" in r or r.get("response") != FINAL_ANSWER or r.get("query") in tool_errors)
+    return {
+        "queries": summary["queries"],
+        "failed": unanswered,
+        "concurrency": concurrency,
+        "query_latency": latency_stats([r["elapsed_seconds"] for r in records if "elapsed_seconds" in r],
+                                       wall_seconds=summary["wall_seconds"]),
+        "tool_cache_hit_rate": round(tool_cache["hits"] / max(1, tool_cache["hits"] + tool_cache["misses"]), 3),
+        "upstream_requests": dict(stubs.requests),
+        "peak_rss_mb": peak_rss_mb(),
+        "servers_peak_rss_mb": children_peak_rss_mb(),
+    }
+
+
+def run_e2e(**options) -> Dict:
+    """Run the end-to-end benchmark in a child process."""
+    args = [sys.executable, "-m", "benchmarks.e2e"]
+    for name, value in options.items():
+        args += [f"--{name.replace('_', '-')}", str(value)]
+    completed = subprocess.run(args, cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"End-to-end benchmark failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end chatbot benchmark with mock Gemini and stubbed upstreams.")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE, help="Connections per MCP server")
+    parser.add_argument("--upstream-latency", type=float, default=DEFAULT_UPSTREAM_LATENCY,
+                        help="Seconds each stubbed ArXiv/AccuWeather request takes")
+    parser.add_argument("--chunk-delay", type=float, default=DEFAULT_LLM_CHUNK_DELAY,
+                        help="Seconds between mock model chunks")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.queries, max(1, args.concurrency), max(1, args.pool_size),
+                              args.upstream_latency, args.chunk_delay))
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import json
+import math
+import platform
+import resource
+import statistics
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Metrics where a larger value is an improvement; for everything else larger is worse
+HIGHER_IS_BETTER = ("ops_per_sec", "papers_per_sec", "hit_rate")
+# Bookkeeping values that are reported but never compared
+NOT_COMPARED = ("count", "queries", "failed", "size", "concurrency")
+# Latency changes smaller than this are timer and scheduler noise, whatever the percentage
+MIN_LATENCY_DELTA_MS = 0.05
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linearly interpolated percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def latency_stats(seconds: List[float], wall_seconds: Optional[float] = None) -> Dict:
+    """
+    p50/p95/p99 and mean in milliseconds, plus throughput. Without a wall
+    time the samples are taken to have run back to back.
+    """
+    values = sorted(seconds)
+    total = wall_seconds if wall_seconds is not None else sum(values)
+    return {
+        "count": len(values),
+        "mean_ms": round(1000 * sum(values) / len(values), 4) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 0.50), 4),
+        "p95_ms": round(1000 * percentile(values, 0.95), 4),
+        "p99_ms": round(1000 * percentile(values, 0.99), 4),
+        "ops_per_sec": round(len(values) / total, 2) if total > 0 else 0.0,
+    }
+
+
+def _maxrss_mb(who: int) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    return _maxrss_mb(resource.RUSAGE_SELF)
+
+
+def children_peak_rss_mb() -> float:
+    """Largest peak resident set size among child processes that have exited."""
+    return _maxrss_mb(resource.RUSAGE_CHILDREN)
+
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a results dict, keyed by dotted path."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def median_results(runs: List[Dict]) -> Dict:
+    """Combine repeated runs into one, taking the median of every numeric value."""
+    combined = {}
+    for key, value in runs[0].items():
+        values = [run[key] for run in runs if key in run]
+        if isinstance(value, dict):
+            combined[key] = median_results(values)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            combined[key] = round(statistics.median(values), 4)
+        else:
+            combined[key] = value
+    return combined
+
+
+def compare(current: Dict, baseline: Dict, threshold_pct: float) -> List[Tuple[str, float, float, float, bool]]:
+    """
+    Numeric diff against a baseline for every metric present in both.
+
+    Returns (metric, baseline, current, change in %, regressed) tuples; a
+    metric has regressed when it got worse by more than threshold_pct (and,
+    for latencies, by more than MIN_LATENCY_DELTA_MS).
+    """
+    rows = []
+    old = flatten(baseline)
+    for path, value in flatten(current).items():
+        name = path.rsplit(".", 1)[-1]
+        if path not in old or name in NOT_COMPARED:
+            continue
+        before = old[path]
+        change = 100.0 * (value - before) / before if before else 0.0
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        regressed = worse > threshold_pct
+        if name.endswith("_ms") and value - before < MIN_LATENCY_DELTA_MS:
+            regressed = False
+        elif name == "ops_per_sec" and value and 1000 / value - 1000 / before < MIN_LATENCY_DELTA_MS:
+            # Throughput drops that add less than the noise floor to each operation
+            regressed = False
+        rows.append((path, before, value, round(change, 1), regressed))
+    return rows
+
+
+def format_comparison(rows: List[Tuple[str, float, float, float, bool]]) -> str:
+    if not rows:
+        return "No metrics in common with the baseline."
+    width = max(len(row[0]) for row in rows)
+    lines = [f"{'metric':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}"]
+    for path, before, value, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{path:<{width}}  {before:>12g}  {value:>12g}  {change:>+7.1f}%{flag}")
+    return "\n".join(lines)
+
+
+def load_results(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_results(path: str, results: Dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,101 @@
+"""
+Offline benchmark suite: storage microbenchmarks and the end-to-end chatbot
+run, compared against a stored baseline.
+
+    python -m benchmarks.run                     # everything, diffed against benchmarks/baseline.json
+    python -m benchmarks.run --suite storage --sizes 1000,1000000
+    python -m benchmarks.run --repeat 3 --update-baseline   # record this machine's numbers as the baseline
+
+Exits non-zero when a metric is worse than the baseline by more than
+--max-regression percent, so the suite can gate a change.
+"""
+import argparse
+import os
+import sys
+import time
+
+from benchmarks import e2e, storage
+from benchmarks.report import compare, environment, format_comparison, load_results, median_results, save_results
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = "1000,10000,100000"
+# Sub-millisecond timings on a shared machine easily move by a third between runs
+DEFAULT_MAX_REGRESSION = 50.0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline benchmarks with mock Gemini and stubbed upstreams.")
+    parser.add_argument("--suite", choices=["all", "storage", "e2e"], default="all")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="Comma-separated storage library sizes (1000000 takes a few minutes)")
+    parser.add_argument("--ops", type=int, default=storage.DEFAULT_OPS, help="Calls per extract_info case")
+    parser.add_argument("--list-ops", type=int, default=storage.DEFAULT_LIST_OPS,
+                        help="Calls per list_saved_papers case")
+    parser.add_argument("--queries", type=int, default=e2e.DEFAULT_QUERIES, help="End-to-end queries")
+    parser.add_argument("--concurrency", type=int, default=e2e.DEFAULT_CONCURRENCY,
+                        help="End-to-end queries processed at once")
+    parser.add_argument("--upstream-latency", type=float, default=e2e.DEFAULT_UPSTREAM_LATENCY,
+                        help="Seconds each stubbed upstream request takes")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Run each benchmark this many times and report the median of every metric")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Percent a metric may worsen before the run fails")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    repeat = max(1, args.repeat)
+    results = {"environment": environment(), "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    if args.suite in ("all", "e2e"):
+        print(f"End-to-end: {args.queries} queries, concurrency {args.concurrency}...", file=sys.stderr)
+        results["e2e"] = median_results([
+            e2e.run_e2e(queries=args.queries, concurrency=args.concurrency, upstream_latency=args.upstream_latency)
+            for _ in range(repeat)
+        ])
+        if results["e2e"]["failed"]:
+            print(f"Warning: {results['e2e']['failed']} end-to-end queries got no final answer", file=sys.stderr)
+
+    if args.suite in ("all", "storage"):
+        results["storage"] = {}
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            print(f"Storage: {size} papers...", file=sys.stderr)
+            results["storage"][str(size)] = median_results([
+                storage.run_size(size, args.ops, args.list_ops) for _ in range(repeat)
+            ])
+
+    if args.output:
+        save_results(args.output, results)
+
+    baseline = load_results(args.baseline)
+    regressed = False
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+    else:
+        rows = compare(results, baseline, args.max_regression)
+        print(format_comparison(rows))
+        regressed = any(row[4] for row in rows)
+        if baseline.get("environment") != results["environment"]:
+            print("Note: the baseline was recorded on a different machine or Python; diffs may not be meaningful.")
+
+    if args.update_baseline:
+        # Keep baseline entries this run didn't measure (e.g. the 1M library)
+        merged = dict(baseline or {})
+        if "e2e" in results:
+            merged["e2e"] = results["e2e"]
+        if "storage" in results:
+            merged["storage"] = {**merged.get("storage", {}), **results["storage"]}
+        merged["environment"] = results["environment"]
+        merged["created"] = results["created"]
+        save_results(args.baseline, merged)
+        print(f"Baseline written to {args.baseline}")
+    elif regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
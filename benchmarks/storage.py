@@ -0,0 +1,144 @@
+"""
+Storage microbenchmarks: the extract_info and list_saved_papers tool bodies
+over a synthetic library of a given size.
+
+Each size runs in its own process (see run_size), so peak RSS and the
+research server's module-level caches belong to that size alone:
+
+    python -m benchmarks.storage --size 100000
+"""
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.report import latency_stats, peak_rss_mb
+
+DEFAULT_OPS = 2000
+DEFAULT_LIST_OPS = 500
+SYNTHETIC_TOPICS = 100
+POPULATE_BATCH = 10000
+HOT_SET = 100
+SEED = 1234
+
+
+def paper_id(i: int) -> str:
+    return f"{2000 + i // 100000}.{i % 100000:05d}"
+
+
+def synthetic_paper(i: int, topic: str) -> Dict:
+    pid = paper_id(i)
+    return {
+        "title": f"Synthetic paper {i} on {topic}",
+        "summary": f"Paper {i} studies {topic} with method {i % 17} on dataset {i % 31}. " * 3,
+        "published": f"{2015 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:00+00:00",
+        "authors": [f"Author {i % 997}", f"Author {(i * 7) % 991}"],
+        "pdf_url": f"http://arxiv.org/pdf/{pid}v1",
+        "doi": None,
+        "topic_searched": topic,
+        "arxiv_url": f"https://arxiv.org/abs/{pid}",
+    }
+
+
+def populate(store, size: int) -> float:
+    """Fill the store with `size` papers spread over SYNTHETIC_TOPICS topics; returns seconds taken."""
+    started = time.perf_counter()
+    for batch_start in range(0, size, POPULATE_BATCH):
+        batch: Dict[str, Dict[str, Dict]] = {}
+        for i in range(batch_start, min(size, batch_start + POPULATE_BATCH)):
+            topic = f"topic {i % SYNTHETIC_TOPICS}"
+            batch.setdefault(topic, {})[paper_id(i)] = synthetic_paper(i, topic)
+        store.upsert_batch(batch)
+    store.checkpoint()
+    return time.perf_counter() - started
+
+
+def measure(fn: Callable[[], str], ops: int) -> Dict:
+    # Untimed warm-up so SQLite's page cache and the paper cache settle first
+    for _ in range(max(1, ops // 10)):
+        fn()
+    samples: List[float] = []
+    # As timeit does, keep collector pauses out of the samples
+    gc.disable()
+    try:
+        for _ in range(ops):
+            started = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - started)
+            if result.startswith("Error"):
+                raise RuntimeError(result)
+    finally:
+        gc.enable()
+    return latency_stats(samples)
+
+
+def run(size: int, ops: int = DEFAULT_OPS, list_ops: int = DEFAULT_LIST_OPS) -> Dict:
+    """Benchmark one library size; the research server must use a fresh paper directory."""
+    import research_server
+
+    # The tools are registered wrapped for the executor; time their bodies directly
+    extract_info = inspect.unwrap(research_server.extract_info.fn)
+    list_saved_papers = inspect.unwrap(research_server.list_saved_papers.fn)
+
+    rng = random.Random(SEED)
+    store = research_server.get_store()
+    populate_seconds = populate(store, size)
+    hot_ids = [paper_id(rng.randrange(size)) for _ in range(HOT_SET)]
+
+    def deep_cursor() -> str:
+        return research_server._encode_cursor(None, "id", (paper_id(rng.randrange(size)),))
+
+    results = {
+        "size": size,
+        "populate_papers_per_sec": round(size / populate_seconds, 1),
+        "extract_info_random": measure(lambda: extract_info(paper_id(rng.randrange(size))), ops),
+        "extract_info_hot": measure(lambda: extract_info(rng.choice(hot_ids)), ops),
+        "extract_info_missing": measure(lambda: extract_info("9999.99999"), ops),
+        "list_first_page": measure(lambda: list_saved_papers(), list_ops),
+        "list_deep_page": measure(lambda: list_saved_papers(cursor=deep_cursor()), list_ops),
+        "list_topic_page": measure(
+            lambda: list_saved_papers(topic=f"topic {rng.randrange(SYNTHETIC_TOPICS)}"), list_ops
+        ),
+        "list_published_desc": measure(lambda: list_saved_papers(sort="published_desc"), list_ops),
+    }
+    asyncio.run(research_server.shutdown())
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def run_size(size: int, ops: int = DEFAULT_OPS, list_ops: int = DEFAULT_LIST_OPS) -> Dict:
+    """Run one size in a child process with its own temporary paper directory."""
+    with tempfile.TemporaryDirectory(prefix="bench-papers-") as paper_dir:
+        env = {**os.environ, "RESEARCH_PAPER_DIR": paper_dir}
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.storage", "--size", str(size), "--ops", str(ops), "--list-ops", str(list_ops)],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Storage benchmark for {size} papers failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage microbenchmark for one library size.")
+    parser.add_argument("--size", type=int, required=True, help="Papers in the synthetic library")
+    parser.add_argument("--ops", type=int, default=DEFAULT_OPS, help="Calls per extract_info case")
+    parser.add_argument("--list-ops", type=int, default=DEFAULT_LIST_OPS, help="Calls per list_saved_papers case")
+    args = parser.parse_args()
+    if "RESEARCH_PAPER_DIR" not in os.environ:
+        parser.error("RESEARCH_PAPER_DIR must name an empty scratch directory")
+    print(json.dumps(run(args.size, args.ops, args.list_ops)))
+
+
+if __name__ == "__main__":
+    main()
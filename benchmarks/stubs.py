@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+from typing import Optional
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+# Results the fake ArXiv feed has for any query
+ARXIV_RESULTS_PER_QUERY = 20
+FORECAST_HOURS = 12
+OBSERVATION_TIME = "2025-01-01T12:00:00+00:00"
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def arxiv_feed(query: str, start: int, page_size: int) -> str:
+    """
+    An ArXiv API Atom page for a query. Results are derived from the query
+    text, so the same query always returns the same papers.
+    """
+    seed = _seed(query)
+    count = max(0, min(page_size, ARXIV_RESULTS_PER_QUERY - start))
+    entries = []
+    for i in range(start, start + count):
+        paper_id = f"{2400 + (seed + i) % 12:04d}.{(seed + i * 7919) % 100000:05d}"
+        title = escape(f"Synthetic study {i} of {query}")
+        entries.append(f"""
+  <entry>
+    <id>http://arxiv.org/abs/{paper_id}v1</id>
+    <updated>2024-01-{1 + i % 28:02d}T00:00:00Z</updated>
+    <published>2024-01-{1 + i % 28:02d}T00:00:00Z</published>
+    <title>{title}</title>
+    <summary>{escape(f"We examine {query} from angle {i}. " * 8)}</summary>
+    <author><name>Author {seed % 97}</name></author>
+    <author><name>Author {(seed + i) % 89}</name></author>
+    <link href="http://arxiv.org/abs/{paper_id}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/{paper_id}v1" rel="related" type="application/pdf"/>
+    <arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <title>ArXiv Query: {escape(query)}</title>
+  <opensearch:totalResults>{ARXIV_RESULTS_PER_QUERY}</opensearch:totalResults>
+  <opensearch:startIndex>{start}</opensearch:startIndex>
+  <opensearch:itemsPerPage>{page_size}</opensearch:itemsPerPage>{"".join(entries)}
+</feed>
+"""
+
+
+class UpstreamStubs:
+    """
+    Local stand-ins for the ArXiv API and AccuWeather, served from one port:
+    ArXiv at /arxiv/api/query and AccuWeather under /accuweather. Each
+    request waits `latency` seconds first, to model upstream round trips.
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1"):
+        self.latency = latency
+        self.host = host
+        self.port: Optional[int] = None
+        self.requests = {"arxiv": 0, "accuweather": 0}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def arxiv_url(self) -> str:
+        return f"http://{self.host}:{self.port}/arxiv/api/query"
+
+    @property
+    def accuweather_url(self) -> str:
+        return f"http://{self.host}:{self.port}/accuweather"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/arxiv/api/query", self.handle_arxiv)
+        app.router.add_get("/accuweather/locations/v1/cities/search", self.handle_location)
+        app.router.add_get("/accuweather/currentconditions/v1/{key}", self.handle_current)
+        app.router.add_get("/accuweather/forecasts/v1/hourly/12hour/{key}", self.handle_forecast)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self, upstream: str):
+        self.requests[upstream] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def handle_arxiv(self, request: web.Request) -> web.Response:
+        await self._delay("arxiv")
+        query = request.query.get("search_query", "")
+        start = int(request.query.get("start", "0"))
+        page_size = int(request.query.get("max_results", "10"))
+        return web.Response(text=arxiv_feed(query, start, page_size), content_type="application/atom+xml")
+
+    async def handle_location(self, request: web.Request) -> web.Response:
+        await self._delay("accuweather")
+        name = request.query.get("q", "").strip()
+        if not name:
+            return web.json_response([])
+        return web.json_response([{
+            "Key": str(_seed(name.lower()) % 1000000),
+            "LocalizedName": name.title(),
+            "Country": {"LocalizedName": "Benchland"},
+        }])
+
+    async def handle_current(self, request: web.Request) -> web.Response:
+        await self._delay("accuweather")
+        seed = _seed(request.match_info["key"])
+        return web.json_response([{
+            "LocalObservationDateTime": OBSERVATION_TIME,
+            "WeatherText": "Partly sunny",
+            "HasPrecipitation": False,
+            "RelativeHumidity": 40 + seed % 50,
+            "Temperature": {"Metric": {"Value": float(seed % 35), "Unit": "C"}},
+        }])
+
+    async def handle_forecast(self, request: web.Request) -> web.Response:
+        await self._delay("accuweather")
+        seed = _seed(request.match_info["key"])
+        return web.json_response([
+            {
+                "Temperature": {"Value": float((seed + hour) % 35), "Unit": "C"},
+                "IconPhrase": "Cloudy" if (seed + hour) % 3 else "Showers",
+                "PrecipitationProbability": (seed * hour) % 100,
+            }
+            for hour in range(FORECAST_HOURS)
+        ])
@@ -0,0 +1,289 @@
+from dotenv import load_dotenv
+from typing import Awaitable, Callable, Dict, Optional
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from aiohttp import WSMsgType, web
+
+from mcp_chatbot import SERVER_CONFIG_PATH, MCP_ChatBot
+from utils import telemetry
+
+load_dotenv()
+
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", "127.0.0.1")
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "8080"))
+# Connections per MCP server, shared by all conversations
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+# Queries answered at once across all conversations, and queries allowed to wait for a slot
+GATEWAY_MAX_ACTIVE_QUERIES = int(os.getenv("GATEWAY_MAX_ACTIVE_QUERIES", "16"))
+GATEWAY_MAX_PENDING_QUERIES = int(os.getenv("GATEWAY_MAX_PENDING_QUERIES", "64"))
+GATEWAY_QUERY_TIMEOUT = float(os.getenv("GATEWAY_QUERY_TIMEOUT", "300"))
+GATEWAY_MAX_CONVERSATIONS = int(os.getenv("GATEWAY_MAX_CONVERSATIONS", "1000"))
+GATEWAY_CONVERSATION_IDLE_SECONDS = float(os.getenv("GATEWAY_CONVERSATION_IDLE_SECONDS", "3600"))
+GATEWAY_SWEEP_INTERVAL = 60.0
+
+
+class GatewayError(Exception):
+    """A request the gateway refuses, with the HTTP status to report."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class QueryScheduler:
+    """
+    Admission control for queries.
+
+    At most max_active queries run at once; up to max_pending more wait for a
+    slot in arrival order, and anything beyond that is rejected right away
+    so clients back off instead of piling up. Since each conversation runs
+    one query at a time, FIFO slots are shared fairly between conversations.
+    """
+
+    def __init__(self, max_active: int, max_pending: int):
+        self.max_active = max_active
+        self.max_pending = max_pending
+        self._slots = asyncio.Semaphore(max_active)
+        self._active = 0
+        self._pending = 0
+        self._stats = {"completed": 0, "failed": 0, "rejected": 0, "timed_out": 0}
+
+    async def run(self, fn: Callable[[], Awaitable[str]], timeout: float) -> Dict:
+        if self._pending >= self.max_pending:
+            self._stats["rejected"] += 1
+            raise GatewayError(429, "Gateway is busy, retry later")
+
+        queued_at = time.perf_counter()
+        self._pending += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._pending -= 1
+
+        self._active += 1
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(fn(), timeout)
+        except asyncio.TimeoutError:
+            self._stats["timed_out"] += 1
+            raise GatewayError(504, f"Query timed out after {timeout:g}s")
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._active -= 1
+            self._slots.release()
+        self._stats["completed"] += 1
+        return {
+            "response": response,
+            "queued_seconds": round(started - queued_at, 4),
+            "elapsed_seconds": round(time.perf_counter() - started, 4),
+        }
+
+    def stats(self) -> Dict:
+        return {"active": self._active, "pending": self._pending, **self._stats}
+
+
+class Conversation:
+    def __init__(self, conversation_id: str, chatbot: MCP_ChatBot):
+        self.id = conversation_id
+        self.chatbot = chatbot
+        self.busy = False
+        self.last_used = time.monotonic()
+
+
+class ChatGateway:
+    """Many conversations in one process, sharing the root chatbot's MCP session pools and model client."""
+
+    def __init__(self, chatbot: MCP_ChatBot, config_path: str = SERVER_CONFIG_PATH, pool_size: int = MCP_POOL_SIZE):
+        self.chatbot = chatbot
+        self.config_path = config_path
+        self.pool_size = pool_size
+        self.scheduler = QueryScheduler(GATEWAY_MAX_ACTIVE_QUERIES, GATEWAY_MAX_PENDING_QUERIES)
+        self.conversations: Dict[str, Conversation] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def start(self, app: web.Application):
+        await self.chatbot.connect_to_servers(self.config_path, pool_size=self.pool_size)
+        if not self.chatbot.connections:
+            print("Warning: No MCP servers could be started; conversations will have no tools")
+        self._sweeper = asyncio.create_task(self._sweep_idle())
+
+    async def stop(self, app: web.Application):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        self.conversations.clear()
+        await self.chatbot.cleanup()
+
+    async def _sweep_idle(self):
+        while True:
+            await asyncio.sleep(GATEWAY_SWEEP_INTERVAL)
+            self._evict_idle()
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - GATEWAY_CONVERSATION_IDLE_SECONDS
+        for conversation_id, conversation in list(self.conversations.items()):
+            if not conversation.busy and conversation.last_used < cutoff:
+                del self.conversations[conversation_id]
+
+    def create_conversation(self) -> Conversation:
+        if len(self.conversations) >= GATEWAY_MAX_CONVERSATIONS:
+            self._evict_idle()
+            if len(self.conversations) >= GATEWAY_MAX_CONVERSATIONS:
+                raise GatewayError(503, "Too many open conversations")
+        conversation = Conversation(uuid.uuid4().hex, self.chatbot.new_conversation())
+        self.conversations[conversation.id] = conversation
+        return conversation
+
+    def get_conversation(self, conversation_id: str) -> Conversation:
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            raise GatewayError(404, f"Unknown conversation '{conversation_id}'")
+        return conversation
+
+    async def ask(self, conversation: Conversation, message: str) -> Dict:
+        """Answer one message; a conversation handles one message at a time."""
+        if not message.strip():
+            raise GatewayError(400, "Message is empty")
+        if conversation.busy:
+            raise GatewayError(409, "This conversation is still answering a previous message")
+        conversation.busy = True
+        try:
+            result = await self.scheduler.run(
+                lambda: conversation.chatbot.process_query(message), GATEWAY_QUERY_TIMEOUT
+            )
+        finally:
+            conversation.busy = False
+            conversation.last_used = time.monotonic()
+        return {"conversation_id": conversation.id, **result}
+
+    def stats(self) -> Dict:
+        cache = self.chatbot.gemini_client.cache
+        return {
+            "conversations": len(self.conversations),
+            "queries": self.scheduler.stats(),
+            "servers": {pool.name: pool.stats() for pool in self.chatbot.connections},
+            "response_cache": cache.stats() if cache else "disabled",
+        }
+
+    # HTTP handlers
+
+    async def handle_create(self, request: web.Request) -> web.Response:
+        conversation = self.create_conversation()
+        return web.json_response({"conversation_id": conversation.id}, status=201)
+
+    async def handle_delete(self, request: web.Request) -> web.Response:
+        conversation = self.get_conversation(request.match_info["conversation_id"])
+        del self.conversations[conversation.id]
+        return web.json_response({"deleted": conversation.id})
+
+    async def handle_message(self, request: web.Request) -> web.Response:
+        conversation = self.get_conversation(request.match_info["conversation_id"])
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise GatewayError(400, "Body must be JSON")
+        message = body.get("message") if isinstance(body, dict) else None
+        if not isinstance(message, str):
+            raise GatewayError(400, "Body needs a 'message' string")
+        return web.json_response(await self.ask(conversation, message))
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """Latency histograms in Prometheus text format (empty unless TELEMETRY_ENABLED=1)."""
+        return web.Response(text=telemetry.registry.render_prometheus(), content_type="text/plain")
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """
+        One conversation per socket (or resumed with ?conversation_id=...).
+        Each text frame is a message, plain or {"message": ...}; each gets one
+        "response" or "error" frame back, in order.
+        """
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        try:
+            conversation_id = request.query.get("conversation_id")
+            conversation = (
+                self.get_conversation(conversation_id) if conversation_id else self.create_conversation()
+            )
+        except GatewayError as e:
+            await ws.send_json({"type": "error", "status": e.status, "error": str(e)})
+            await ws.close()
+            return ws
+        await ws.send_json({"type": "conversation", "conversation_id": conversation.id})
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            message = msg.data
+            try:
+                parsed = json.loads(message)
+                if isinstance(parsed, dict):
+                    message = parsed.get("message", "")
+            except json.JSONDecodeError:
+                pass
+            try:
+                await ws.send_json({"type": "response", **await self.ask(conversation, str(message))})
+            except GatewayError as e:
+                await ws.send_json({"type": "error", "status": e.status, "error": str(e)})
+            except Exception as e:
+                await ws.send_json({"type": "error", "status": 500, "error": str(e) or type(e).__name__})
+        return ws
+
+
+@web.middleware
+async def error_middleware(request: web.Request, handler):
+    try:
+        return await handler(request)
+    except GatewayError as e:
+        headers = {"Retry-After": "1"} if e.status == 429 else None
+        return web.json_response({"error": str(e)}, status=e.status, headers=headers)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        return web.json_response({"error": str(e) or type(e).__name__}, status=500)
+
+
+def create_app(gateway: ChatGateway) -> web.Application:
+    app = web.Application(middlewares=[error_middleware])
+    app.router.add_post("/conversations", gateway.handle_create)
+    app.router.add_delete("/conversations/{conversation_id}", gateway.handle_delete)
+    app.router.add_post("/conversations/{conversation_id}/messages", gateway.handle_message)
+    app.router.add_get("/ws", gateway.handle_websocket)
+    app.router.add_get("/stats", gateway.handle_stats)
+    app.router.add_get("/metrics", gateway.handle_metrics)
+    app.on_startup.append(gateway.start)
+    app.on_cleanup.append(gateway.stop)
+    return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="HTTP/WebSocket gateway hosting many chatbot conversations.")
+    parser.add_argument("--host", default=GATEWAY_HOST)
+    parser.add_argument("--port", type=int, default=GATEWAY_PORT)
+    parser.add_argument("--config", default=SERVER_CONFIG_PATH, help="MCP server config file")
+    parser.add_argument("--pool-size", type=int, default=MCP_POOL_SIZE, help="Connections per MCP server")
+    parser.add_argument("--mock", action="store_true", help="Use mock Gemini responses (no API key needed)")
+    parser.add_argument("--mock-response", default="Mocked response", help="Text every mock generation returns")
+    parser.add_argument("--mock-delay", type=float, default=0.0, help="Seconds between mock stream chunks")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    chatbot = MCP_ChatBot(mock_mode=args.mock, verbose=False)
+    if args.mock:
+        chatbot.gemini_client.set_mock_response(None, {"response": args.mock_response, "chunk_delay": args.mock_delay})
+    gateway = ChatGateway(chatbot, config_path=args.config, pool_size=max(1, args.pool_size))
+    web.run_app(create_app(gateway), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
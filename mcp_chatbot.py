@@ -1,77 +1,53 @@
 from dotenv import load_dotenv
-from mcp import ClientSession, StdioServerParameters, types
-from mcp.client.stdio import stdio_client
 from typing import List, Optional, Dict
+import argparse
 import asyncio
-import nest_asyncio
+import copy
 import os
 import json
+import sys
 
-nest_asyncio.apply()
+from utils import telemetry
+from utils.batch_runner import DEFAULT_QUERY_FIELD, run_batch
+from utils.gemini_client import GeminiClientWrapper
+from utils.mcp_connections import DEFAULT_MAX_IN_FLIGHT, SessionPool, connect_pools, load_server_config
+from utils.prompt_builder import PromptBuilder
+from utils.response_cache import ResponseCache
+from utils.tool_cache import ToolResultCache, is_cacheable_result, load_tool_cache_config
+from utils.telemetry import span, trace_meta, traced
+from utils.tool_call_stream import ToolCallDetector, as_tool_call
 
 load_dotenv()
 
-class GeminiClientWrapper:
-    """Wrapper for the Gemini client to handle generation requests."""
-    
-    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = "gemini-2.0-flash", mock_mode: bool = False):
-        self.mock_mode = mock_mode
-        
-        if not mock_mode:
-            import google.generativeai as genai
-            
-            if api_key is None:
-                api_key = os.getenv("GEMINI_API_KEY")
-            if model_name is None:
-                model_name = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash")
-            
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY must be set in env or passed directly")
-            
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel(model_name)
-        else:
-            self.mock_responses = {}
-    
-    def set_mock_response(self, step_id: str, response: Dict):
-        if not self.mock_mode:
-            raise ValueError("Cannot set mock responses when not in mock mode")
-        self.mock_responses[step_id] = response
-    
-    def generate_response(self, prompt: str, step_id: Optional[str] = None) -> str:
-        if self.mock_mode:
-            return self.mock_responses.get(step_id, {}).get("response", "Mocked response")
-        else:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+SERVER_CONFIG_PATH = os.getenv(
+    "MCP_SERVER_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils", "server_config.json")
+)
+SERVER_CONNECT_TIMEOUT = float(os.getenv("MCP_SERVER_CONNECT_TIMEOUT", "30"))
+# Tool calls in flight per server connection before further calls queue
+SERVER_MAX_IN_FLIGHT = int(os.getenv("MCP_SERVER_MAX_IN_FLIGHT", str(DEFAULT_MAX_IN_FLIGHT)))
 
-class MCP_ChatBot:
+# Cache of complete model responses, keyed by model, prompt and generation config
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_DB = os.getenv(
+    "LLM_CACHE_DB", os.path.join(os.path.expanduser("~"), ".cache", "mcp-chatbot", "responses.db")
+)
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "10000"))
 
-    def __init__(self, mock_mode: bool = False):
-        # Initialize session and client objects
-        self.session: ClientSession = None
-        self.gemini_client = GeminiClientWrapper(mock_mode=mock_mode)
-        self.available_tools: List[dict] = []
+# Prompt size limits, in estimated tokens
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "16000"))
+TOOL_RESULT_MAX_TOKENS = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "2000"))
 
-    def _create_tool_prompt(self, query: str, conversation_history: List[Dict] = None) -> str:
-        """Create a prompt for Gemini that includes tool descriptions and conversation history."""
-        prompt_parts = []
-        
-        # Add system instruction about tool usage
-        prompt_parts.append("""You are an AI assistant with access to tools. You can call tools to help answer user questions.
+# Queries processed at once in batch mode
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
 
-Available tools:""")
-        
-        # Add tool descriptions
-        for tool in self.available_tools:
-            tool_desc = f"""
-Tool: {tool['name']}
-Description: {tool['description']}
-Input Schema: {json.dumps(tool['input_schema'], indent=2)}
-"""
-            prompt_parts.append(tool_desc)
-        
-        prompt_parts.append("""
+# Limits for the tool calls requested in a single model turn
+MAX_TOOL_CALLS_PER_TURN = int(os.getenv("MAX_TOOL_CALLS_PER_TURN", "8"))
+TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", "4"))
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "60"))
+
+TOOL_CALL_INSTRUCTIONS = """
 When you need to use a tool, respond with a JSON object in this format:
 {
     "action": "tool_call",
@@ -82,40 +58,125 @@ When you need to use a tool, respond with a JSON object in this format:
     }
 }
 
+To call several independent tools at once, respond with a JSON list of such objects:
+[
+    {"action": "tool_call", "tool_name": "tool_a", "tool_args": {...}},
+    {"action": "tool_call", "tool_name": "tool_b", "tool_args": {...}}
+]
+
 When you don't need to use a tool, just respond normally with text.
+"""
 
-""")
-        
-        # Add conversation history if provided
-        if conversation_history:
-            prompt_parts.append("Conversation history:")
-            for message in conversation_history:
-                if message['role'] == 'user':
-                    prompt_parts.append(f"User: {message['content']}")
-                elif message['role'] == 'assistant':
-                    prompt_parts.append(f"Assistant: {message['content']}")
-                elif message['role'] == 'tool_result':
-                    prompt_parts.append(f"Tool result: {message['content']}")
-            prompt_parts.append("")
-        
-        # Add current query
-        prompt_parts.append(f"User: {query}")
-        prompt_parts.append("Assistant:")
-        
-        return "\n".join(prompt_parts)
+class StreamPrinter:
+    """
+    Print model output to the console as it streams.
+
+    Output that starts like JSON may be a tool call, so it is held back and
+    left to process_query to report.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.mode = None  # None until the first non-whitespace character, then "text" or "json"
+        self.printed = False
 
+    def __call__(self, chunk: str):
+        if self.mode is None:
+            stripped = chunk.lstrip()
+            if not stripped:
+                return
+            self.mode = "json" if stripped[0] in "{[" else "text"
+            chunk = stripped
+        if self.mode == "text" and self.enabled:
+            print(chunk, end="", flush=True)
+            self.printed = True
+
+    def finish(self):
+        if self.printed:
+            print()
+
+
+class MCP_ChatBot:
+
+    def __init__(self, mock_mode: bool = False, verbose: bool = True):
+        # Console output of streamed answers and tool calls; batch runs turn it off
+        self.verbose = verbose
+        # Initialize server connections and client objects
+        self.connections: List[SessionPool] = []
+        self.tool_to_session: Dict[str, SessionPool] = {}
+        # Mock runs script their responses, so they never go through the cache
+        cache = None
+        if LLM_CACHE_ENABLED and not mock_mode:
+            cache = ResponseCache(
+                LLM_CACHE_DB,
+                ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                disk_entries=LLM_CACHE_DISK_ENTRIES,
+            )
+        self.gemini_client = GeminiClientWrapper(mock_mode=mock_mode, cache=cache)
+        self.available_tools: List[dict] = []
+        # Tool results memoized for this chat session; policies come from the server config
+        self.tool_cache_config: Dict = {}
+        self.tool_cache = ToolResultCache()
+        # History kept across queries; None starts every query afresh
+        self.history: Optional[PromptBuilder] = None
+        self._render_tool_manifest()
+
+    def new_conversation(self) -> "MCP_ChatBot":
+        """
+        A chatbot for one more conversation, with its own history and tool
+        cache, sharing this one's server pools and model client.
+        """
+        conversation = copy.copy(self)
+        conversation.verbose = False
+        conversation.tool_cache = ToolResultCache.from_config(self.tool_cache_config)
+        conversation.history = self._new_history()
+        return conversation
+
+    def _render_tool_manifest(self):
+        """Render the instructions and tool list once, whenever the set of tools changes."""
+        tool_descs = [
+            f"Tool: {tool['name']}\n"
+            f"Description: {tool['description']}\n"
+            f"Input Schema: {json.dumps(tool['input_schema'], separators=(',', ':'))}"
+            for tool in self.available_tools
+        ]
+        self._prompt_prefix = "\n".join([
+            "You are an AI assistant with access to tools. You can call tools to help answer user questions.",
+            "",
+            "Available tools:",
+            "\n\n".join(tool_descs),
+            TOOL_CALL_INSTRUCTIONS,
+        ])
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _new_history(self) -> PromptBuilder:
+        return PromptBuilder(self._prompt_prefix, PROMPT_TOKEN_BUDGET, TOOL_RESULT_MAX_TOKENS)
+
+    @traced("prompt.build")
+    def _create_tool_prompt(self, query: str, conversation_history: Optional[PromptBuilder] = None) -> str:
+        """Create a prompt for Gemini that includes tool descriptions and conversation history."""
+        if conversation_history is None:
+            conversation_history = self._new_history()
+        return conversation_history.build(query)
+
+    @traced("response.parse")
     def _parse_gemini_response(self, response_text: str):
-        """Parse Gemini response to check if it contains a tool call."""
+        """Parse Gemini response to check if it contains one or more tool calls."""
         response_text = response_text.strip()
         
-        # Try to parse as JSON for tool calls
+        # Try to parse as JSON for tool calls: a single object or a list of them
         try:
             parsed = json.loads(response_text)
-            if isinstance(parsed, dict) and parsed.get("action") == "tool_call":
+            items = parsed if isinstance(parsed, list) else [parsed]
+            calls = [call for call in map(as_tool_call, items) if call is not None]
+            if calls:
                 return {
-                    "type": "tool_call",
-                    "tool_name": parsed.get("tool_name"),
-                    "tool_args": parsed.get("tool_args", {})
+                    "type": "tool_calls",
+                    "calls": calls[:MAX_TOOL_CALLS_PER_TURN]
                 }
         except json.JSONDecodeError:
             pass
@@ -126,78 +187,153 @@ When you don't need to use a tool, just respond normally with text.
             "content": response_text
         }
 
-    async def process_query(self, query):
-        conversation_history = []
+    async def _run_tool_call(self, call: Dict, semaphore: asyncio.Semaphore) -> str:
+        """Run one tool call; the result or error is returned as text."""
+        tool_name = call["tool_name"]
+        tool_args = call["tool_args"]
+        self._log(f"Calling tool {tool_name} with args {tool_args}")
+        try:
+            async with semaphore:
+                # Call the tool through MCP session, unless an earlier result can be reused
+                result, reused = await asyncio.wait_for(
+                    self.tool_cache.call(
+                        tool_name,
+                        tool_args,
+                        lambda: self.call_tool(tool_name, tool_args),
+                        cacheable=is_cacheable_result,
+                    ),
+                    TOOL_CALL_TIMEOUT,
+                )
+            tool_result = str(result.content)
+            if reused:
+                self._log(f"Tool result (reused): {tool_result}")
+                return f"(reused earlier result for the same call) {tool_result}"
+            self._log(f"Tool result: {tool_result}")
+            return tool_result
+        except asyncio.TimeoutError:
+            error_msg = f"Error calling tool {tool_name}: timed out after {TOOL_CALL_TIMEOUT:g}s"
+        except Exception as e:
+            error_msg = f"Error calling tool {tool_name}: {str(e)}"
+        self._log(error_msg)
+        return f"Error: {error_msg}"
+
+    async def _run_tool_calls(self, calls: List[Dict]) -> List[str]:
+        """Run one turn's tool calls concurrently; results are returned in call order."""
+        semaphore = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
+        return await asyncio.gather(*(self._run_tool_call(call, semaphore) for call in calls))
+
+    async def _generate_turn(self, prompt: str):
+        """
+        Stream one model turn, starting each tool call as soon as it is complete.
+
+        Once the response is known to be tool calls and all of them have
+        arrived, the rest of the generation is cancelled. Returns the parsed
+        response and the tasks already running its tool calls.
+        """
+        printer = StreamPrinter(self.verbose)
+        detector = ToolCallDetector(MAX_TOOL_CALLS_PER_TURN)
+        semaphore = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
+        tasks: List[asyncio.Task] = []
+        parts = []
+        stream = self.gemini_client.stream_response(prompt)
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+                printer(chunk)
+                for call in detector.feed(chunk):
+                    tasks.append(asyncio.create_task(self._run_tool_call(call, semaphore)))
+                if detector.done:
+                    break
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            await stream.aclose()
+        printer.finish()
+
+        if tasks:
+            if detector.done:
+                # The stream was cut short, so stream_response didn't cache it; the calls are complete
+                await self.gemini_client.cache_response(prompt, "".join(parts))
+            return {"type": "tool_calls", "calls": detector.calls}, tasks
+        parsed_response = self._parse_gemini_response("".join(parts))
+        if parsed_response["type"] == "text" and not printer.printed:
+            self._log(parsed_response["content"])
+        return parsed_response, tasks
+
+    @traced("chat.query")
+    async def process_query(self, query: str) -> str:
+        """Answer one query, calling tools as the model requests them; returns the final answer."""
+        conversation_history = self.history if self.history is not None else self._new_history()
+        history_start = len(conversation_history)
         original_query = query  # Store the original query
         current_query = query  # Keep track of the current query
         
-        while True:  # Use while True instead of process_query flag
-            # Create prompt with current query and conversation history
-            prompt = self._create_tool_prompt(current_query, conversation_history)
+        try:
+            while True:  # Use while True instead of process_query flag
+                # Create prompt with current query and conversation history
+                prompt = self._create_tool_prompt(current_query, conversation_history)
             
-            # Get response from Gemini
-            response_text = self.gemini_client.generate_response(prompt)
-            parsed_response = self._parse_gemini_response(response_text)
+                # Stream the response from Gemini; tool calls start while it is still generating
+                parsed_response, tool_tasks = await self._generate_turn(prompt)
             
-            if parsed_response["type"] == "text":
-                # Regular text response - this is our final answer
-                print(parsed_response["content"])
-                break  # Exit the loop, we have our final response
+                if parsed_response["type"] == "text":
+                    # Regular text response - this is our final answer
+                    if self.history is not None:
+                        # Keep the exchange for later queries, with the query ahead of its tool steps
+                        conversation_history.insert(history_start, "user", original_query)
+                        conversation_history.add("assistant", parsed_response["content"])
+                    return parsed_response["content"]
                 
-            elif parsed_response["type"] == "tool_call":
-                # Tool call response
-                tool_name = parsed_response["tool_name"]
-                tool_args = parsed_response["tool_args"]
+                elif parsed_response["type"] == "tool_calls":
+                    calls = parsed_response["calls"]
+                    tool_names = ", ".join(call["tool_name"] for call in calls)
                 
-                print(f"Calling tool {tool_name} with args {tool_args}")
+                    # Add the tool calls to conversation history
+                    conversation_history.add("assistant", f"I need to use the {tool_names} tool{'s' if len(calls) > 1 else ''} to help answer your question.")
                 
-                # Add the tool call to conversation history
-                conversation_history.append({
-                    "role": "assistant",
-                    "content": f"I need to use the {tool_name} tool to help answer your question."
-                })
+                    if tool_tasks:
+                        tool_results = await asyncio.gather(*tool_tasks)
+                    else:
+                        tool_results = await self._run_tool_calls(calls)
+                    failed = 0
+                    for call, tool_result in zip(calls, tool_results):
+                        if tool_result.startswith("Error: "):
+                            failed += 1
+                        label = f"[{call['tool_name']}] " if len(calls) > 1 else ""
+                        conversation_history.add("tool_result", f"{label}{tool_result}")
                 
-                try:
-                    # Call the tool through MCP session
-                    result = await self.session.call_tool(tool_name, arguments=tool_args)
-                    tool_result = str(result.content)
-                    
-                    print(f"Tool result: {tool_result}")
-                    
-                    # Add tool result to conversation history
-                    conversation_history.append({
-                        "role": "tool_result",
-                        "content": tool_result
-                    })
-                    
-                    # Update the query to ask for interpretation of the tool result
-                    # This ensures the next iteration will generate a response based on the tool result
-                    current_query = f"Based on the tool result above, please provide a comprehensive answer to the user's original question: '{original_query}'. Use the information from the tool result to give a helpful and detailed response."
-                    
-                    # Continue the loop to get the final response
-                    
-                except Exception as e:
-                    error_msg = f"Error calling tool {tool_name}: {str(e)}"
-                    print(error_msg)
-                    conversation_history.append({
-                        "role": "tool_result",
-                        "content": f"Error: {error_msg}"
-                    })
-                    # Set the query to handle the error and provide a response
-                    current_query = f"There was an error with the tool call: {error_msg}. Please provide a helpful response to the user's original query: '{original_query}'"
-                    # Continue the loop to get an error handling response
+                    # Feed every result back in a single follow-up prompt
+                    if failed == len(calls):
+                        current_query = f"There was an error with the tool call{'s' if len(calls) > 1 else ''} above. Please provide a helpful response to the user's original query: '{original_query}'"
+                    else:
+                        current_query = f"Based on the tool result{'s' if len(calls) > 1 else ''} above, please provide a comprehensive answer to the user's original question: '{original_query}'. Use the information from the tool result{'s' if len(calls) > 1 else ''} to give a helpful and detailed response."
+        except BaseException:
+            # Don't leave a failed or cancelled query's tool steps in the history without the query
+            conversation_history.truncate(history_start)
+            raise
 
     async def chat_loop(self):
         """Run an interactive chat loop"""
         print("\nMCP Chatbot Started!")
-        print("Type your queries or 'quit' to exit.")
+        print("Type your queries, 'stats' for cache metrics, or 'quit' to exit.")
         
         while True:
             try:
-                query = input("\nQuery: ").strip()
+                # Read input in a thread so MCP sessions keep running meanwhile
+                query = (await asyncio.to_thread(input, "\nQuery: ")).strip()
         
                 if query.lower() == 'quit':
                     break
+                if query.lower() == 'stats':
+                    cache = self.gemini_client.cache
+                    print(json.dumps({
+                        "response_cache": cache.stats() if cache else "disabled",
+                        "tool_cache": self.tool_cache.stats(),
+                        "latency": telemetry.registry.snapshot() if telemetry.enabled() else "disabled (set TELEMETRY_ENABLED=1)",
+                    }, indent=2))
+                    continue
                     
                 await self.process_query(query)
                 print("\n" + "="*50 + "\n")  # Add separator between queries
@@ -206,37 +342,99 @@ When you don't need to use a tool, just respond normally with text.
                 print(f"\nError: {str(e)}")
 
     
-    async def connect_to_server_and_run(self):
-        # Create server parameters for stdio connection
-        server_params = StdioServerParameters(
-            command="uv",  # Executable
-            args=["run", "research_server.py"],  # Optional command line arguments
-            env=None,  # Optional environment variables
+    async def call_tool(self, tool_name: str, tool_args: Dict):
+        """Dispatch a tool call to the session pool of the server that provides it."""
+        session = self.tool_to_session.get(tool_name)
+        if session is None:
+            raise ValueError(f"Unknown tool '{tool_name}'")
+        with span("mcp.call_tool", tool=tool_name):
+            # The server continues this trace from the request metadata
+            return await session.call_tool(tool_name, arguments=tool_args, meta=trace_meta())
+
+    async def connect_to_servers(self, config_path: str = SERVER_CONFIG_PATH, pool_size: int = 1):
+        """Start every server in the config concurrently and route tools to their session pools."""
+        config = load_server_config(config_path)
+        self.tool_cache_config = load_tool_cache_config(config_path)
+        self.tool_cache = ToolResultCache.from_config(self.tool_cache_config)
+        self.connections = await connect_pools(
+            config, size=pool_size, max_in_flight=SERVER_MAX_IN_FLIGHT, timeout=SERVER_CONNECT_TIMEOUT
         )
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                self.session = session
-                # Initialize the connection
-                await session.initialize()
-    
-                # List available tools
-                response = await session.list_tools()
-                
-                tools = response.tools
-                print("\nConnected to server with tools:", [tool.name for tool in tools])
-                
-                self.available_tools = [{
+
+        for connection in self.connections:
+            self._log(f"\nConnected to {connection.name} with tools: {[tool.name for tool in connection.tools]}")
+            for tool in connection.tools:
+                if tool.name in self.tool_to_session:
+                    print(f"Warning: Tool '{tool.name}' from {connection.name} is already provided by another server; ignoring it", file=sys.stderr)
+                    continue
+                self.tool_to_session[tool.name] = connection
+                self.available_tools.append({
                     "name": tool.name,
                     "description": tool.description,
                     "input_schema": tool.inputSchema
-                } for tool in response.tools]
-    
-                await self.chat_loop()
+                })
+        self._render_tool_manifest()
+
+    async def cleanup(self):
+        """Shut down all server connections."""
+        await asyncio.gather(*(connection.close() for connection in self.connections))
+        self.connections = []
+        self.tool_to_session = {}
+        self.available_tools = []
+        self._render_tool_manifest()
+        self.tool_cache.clear()
+        if self.gemini_client.cache is not None:
+            self.gemini_client.cache.close()
+
+    async def connect_to_server_and_run(self):
+        try:
+            await self.connect_to_servers()
+            if not self.connections:
+                print("No MCP servers could be started. Check", SERVER_CONFIG_PATH)
+                return
+            await self.chat_loop()
+        finally:
+            await self.cleanup()
+
+    async def _process_batch_query(self, query: str) -> str:
+        """Answer one batch query in a conversation of its own, so no tool results carry over between queries."""
+        return await self.new_conversation().process_query(query)
+
+    async def run_batch(self, input_path: str, output_path: str, concurrency: int = BATCH_CONCURRENCY,
+                        field: str = DEFAULT_QUERY_FIELD, id_field: Optional[str] = None):
+        """Answer every query in a JSONL file over shared server sessions, writing JSONL results as they finish."""
+        try:
+            await self.connect_to_servers()
+            if not self.connections:
+                print("No MCP servers could be started. Check", SERVER_CONFIG_PATH, file=sys.stderr)
+                return
+            if output_path == "-":
+                summary = await run_batch(self._process_batch_query, input_path, sys.stdout, concurrency, field, id_field)
+            else:
+                with open(output_path, "w", encoding="utf-8") as output:
+                    summary = await run_batch(self._process_batch_query, input_path, output, concurrency, field, id_field)
+            print(f"Batch finished: {json.dumps(summary)}", file=sys.stderr)
+        finally:
+            await self.cleanup()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="MCP chatbot: interactive by default, or headless with --batch.")
+    parser.add_argument("--batch", metavar="INPUT_JSONL", help="Answer the queries in a JSONL file instead of chatting")
+    parser.add_argument("--output", default="-", help="JSONL file for batch results ('-' for stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Queries processed at once")
+    parser.add_argument("--field", default=DEFAULT_QUERY_FIELD, help="Key holding the query in each input line")
+    parser.add_argument("--id-field", help="Key copied from each input line into its result as 'id'")
+    return parser.parse_args()
 
 
 async def main():
-    chatbot = MCP_ChatBot()
-    await chatbot.connect_to_server_and_run()
+    args = parse_args()
+    if args.batch:
+        chatbot = MCP_ChatBot(verbose=False)
+        await chatbot.run_batch(args.batch, args.output, max(1, args.concurrency), args.field, args.id_field)
+    else:
+        chatbot = MCP_ChatBot()
+        await chatbot.connect_to_server_and_run()
   
 
 if __name__ == "__main__":
@@ -1,25 +1,243 @@
 import arxiv
+import asyncio
+import base64
+import contextvars
 import os
+import sys
 import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from fastmcp import FastMCP
 
+from utils.paper_cache import PaperCache
+from utils.pdf_pipeline import MAX_SLICE_BYTES, PdfStore, fetch_and_extract
+from utils.paper_store import PAPER_FIELDS, SORT_ORDERS, PaperStore, topic_key
+from utils.query_cache import QueryCache, normalize_query
+from utils.rate_limit import TokenBucket
+from utils.related import TfidfIndex, related_tokens
+from utils.server_runner import install_telemetry, offload, parse_server_args, serve
+from utils.telemetry import span
+from utils.text_index import BM25Index, paper_tokens
+
 
 # Configuration
-PAPER_DIR = "papers"
+PAPER_DIR = os.getenv("RESEARCH_PAPER_DIR", "papers")
+PAPER_DB = os.path.join(PAPER_DIR, "papers.db")
+QUERY_CACHE_DB = os.path.join(PAPER_DIR, "query_cache.db")
+PDF_DIR = os.path.join(PAPER_DIR, "pdfs")
 DEFAULT_MAX_RESULTS = 5
+CACHE_MAX_PAPERS = int(os.getenv("PAPER_CACHE_MAX_PAPERS", "10000"))
+CACHE_MAX_TOPICS = int(os.getenv("PAPER_CACHE_MAX_TOPICS", "64"))
+# ArXiv's API terms ask for no more than one request every three seconds
+ARXIV_REQUESTS_PER_SECOND = float(os.getenv("ARXIV_REQUESTS_PER_SECOND", str(1 / 3)))
+ARXIV_BURST = float(os.getenv("ARXIV_BURST", "1"))
+ARXIV_RETRIES = int(os.getenv("ARXIV_RETRIES", "3"))
+BATCH_MAX_WORKERS = int(os.getenv("SEARCH_BATCH_MAX_WORKERS", "4"))
+BATCH_MAX_TOPICS = 10
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1000"))
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+DEFAULT_LIST_FIELDS = ["title", "authors", "published", "topic_searched", "arxiv_url"]
+PDF_DOWNLOAD_CONCURRENCY = int(os.getenv("PDF_DOWNLOAD_CONCURRENCY", "4"))
+PDF_BATCH_MAX_PAPERS = 20
+STORE_COMPACT_INTERVAL = float(os.getenv("PAPER_STORE_COMPACT_INTERVAL", "30"))
+# Blocking tools run on thread pools; ArXiv queries get their own so they can't hold up local lookups
+NETWORK_TOOL_THREADS = int(os.getenv("RESEARCH_NETWORK_TOOL_THREADS", "4"))
+LOCAL_TOOL_THREADS = int(os.getenv("RESEARCH_LOCAL_TOOL_THREADS", "8"))
+HTTP_PORT = 8001
+# Alternative ArXiv API endpoint (e.g. a local stub for offline benchmarks)
+ARXIV_API_URL = os.getenv("ARXIV_API_URL")
 
 # Initialize FastMCP server
 mcp = FastMCP("research")
 
+_store: Optional[PaperStore] = None
+_cache: Optional[PaperCache] = None
+_text_index: Optional[BM25Index] = None
+_related_index: Optional[TfidfIndex] = None
+_arxiv_client: Optional[arxiv.Client] = None
+_query_cache: Optional[QueryCache] = None
+_pdf_store: Optional[PdfStore] = None
+
+_network_executor = ThreadPoolExecutor(max_workers=NETWORK_TOOL_THREADS, thread_name_prefix="research-network")
+_local_executor = ThreadPoolExecutor(max_workers=LOCAL_TOOL_THREADS, thread_name_prefix="research-local")
+
+# Tools run on several threads at once, so lazy singletons are created under a lock
+_init_lock = threading.RLock()
+
+# Shared across all searches so concurrent batches stay within ArXiv's rate limit
+_arxiv_bucket = TokenBucket(ARXIV_REQUESTS_PER_SECOND, ARXIV_BURST)
+
+
+def get_store() -> PaperStore:
+    """Open the paper store on first use, importing any legacy JSON topic files."""
+    global _store
+    if _store is None:
+        with _init_lock:
+            if _store is None:
+                _store = PaperStore(PAPER_DB)
+                _store.migrate_from_json(PAPER_DIR)
+                _store.start_compactor(STORE_COMPACT_INTERVAL)
+    return _store
+
+
+def get_cache() -> PaperCache:
+    """Process-wide read cache in front of the paper store."""
+    global _cache
+    if _cache is None:
+        with _init_lock:
+            if _cache is None:
+                _cache = PaperCache(get_store(), max_papers=CACHE_MAX_PAPERS, max_topics=CACHE_MAX_TOPICS)
+    return _cache
+
+
+def get_query_cache() -> QueryCache:
+    """Persistent cache of ArXiv search results keyed by normalized query."""
+    global _query_cache
+    if _query_cache is None:
+        with _init_lock:
+            if _query_cache is None:
+                _query_cache = QueryCache(QUERY_CACHE_DB, ttl_seconds=QUERY_CACHE_TTL_SECONDS, max_entries=QUERY_CACHE_MAX_ENTRIES)
+    return _query_cache
+
+
+def get_pdf_store() -> PdfStore:
+    """Content-addressed store for downloaded PDFs and their extracted text."""
+    global _pdf_store
+    if _pdf_store is None:
+        with _init_lock:
+            if _pdf_store is None:
+                _pdf_store = PdfStore(PDF_DIR)
+    return _pdf_store
+
+
+def get_arxiv_client() -> arxiv.Client:
+    """Shared ArXiv client; request pacing and retries are done in _fetch_papers instead of the client."""
+    global _arxiv_client
+    if _arxiv_client is None:
+        with _init_lock:
+            if _arxiv_client is None:
+                client = arxiv.Client(page_size=100, delay_seconds=0, num_retries=0)
+                if ARXIV_API_URL:
+                    client.query_url_format = ARXIV_API_URL + "?{}"
+                _arxiv_client = client
+    return _arxiv_client
+
+
+def get_text_index() -> BM25Index:
+    """Full-text index over saved papers, built from the store on first use."""
+    global _text_index
+    if _text_index is None:
+        with _init_lock:
+            if _text_index is None:
+                index = BM25Index()
+                index.add_many(
+                    (paper_id, paper_tokens(paper_data))
+                    for paper_id, paper_data in get_store().list_papers().items()
+                )
+                _text_index = index
+    return _text_index
+
+
+def get_related_index() -> TfidfIndex:
+    """TF-IDF similarity index over saved papers, built from the store on first use."""
+    global _related_index
+    if _related_index is None:
+        with _init_lock:
+            if _related_index is None:
+                index = TfidfIndex()
+                for paper_id, paper_data in get_store().list_papers().items():
+                    index.add(paper_id, related_tokens(paper_data))
+                _related_index = index
+    return _related_index
+
+
+def _index_new_papers(papers_info: Dict[str, Dict]):
+    # Indexes that haven't been built yet will pick the papers up from the store;
+    # the lock keeps a build in another thread from missing them
+    with _init_lock:
+        if _text_index is not None:
+            _text_index.add_many(
+                (paper_id, paper_tokens(paper_data))
+                for paper_id, paper_data in papers_info.items()
+                if paper_id not in _text_index
+            )
+        if _related_index is not None:
+            for paper_id, paper_data in papers_info.items():
+                _related_index.add(paper_id, related_tokens(paper_data))
+
+def _fetch_papers(topic: str, max_results: int) -> Dict[str, Dict]:
+    """
+    Query ArXiv for a topic and return {paper ID: paper record} in result order.
+
+    Every attempt, retries included, waits its turn in _arxiv_bucket. Results
+    are capped at 50, well within one page, so each attempt is one request.
+    """
+    search = arxiv.Search(
+        query=topic.strip(),
+        max_results=max_results,
+        sort_by=arxiv.SortCriterion.Relevance
+    )
+    
+    for attempt in range(ARXIV_RETRIES + 1):
+        with span("arxiv.rate_limit"):
+            _arxiv_bucket.acquire()
+        try:
+            with span("arxiv.search", max_results=max_results, attempt=attempt) as search_span:
+                results = list(get_arxiv_client().results(search))
+                search_span.set(results=len(results))
+            break
+        # HTTP errors and empty pages are ArxivErrors; requests' connection errors are OSErrors
+        except (arxiv.ArxivError, OSError):
+            if attempt == ARXIV_RETRIES:
+                raise
+    
+    papers_info = {}
+    for paper in results:
+        paper_id = paper.entry_id.split("/")[-1]
+        
+        # Extract paper information
+        papers_info[paper_id] = {
+            "title": paper.title.strip(),
+            "summary": paper.summary.strip(),
+            "published": paper.published.isoformat() if paper.published else None,
+            "authors": [author.name for author in paper.authors],
+            "pdf_url": paper.pdf_url,
+            "doi": paper.doi,
+            "topic_searched": topic,
+            "arxiv_url": f"https://arxiv.org/abs/{paper_id}"
+        }
+    return papers_info
+
+
+def _to_json(value, **kwargs) -> str:
+    """json.dumps for tool results, timed as its own span."""
+    with span("json.dump"):
+        return json.dumps(value, **kwargs)
+
+
+def _save_papers(papers_by_topic: Dict[str, Dict[str, Dict]]) -> Dict[str, int]:
+    """Persist search results in one transaction and refresh in-process views."""
+    with span("store.upsert_batch", topics=len(papers_by_topic)):
+        new_counts = get_store().upsert_batch(papers_by_topic)
+    get_cache().notify_write()
+    for papers_info in papers_by_topic.values():
+        _index_new_papers(papers_info)
+    return new_counts
+
 @mcp.tool()
-def search_papers(topic: str, max_results: int = DEFAULT_MAX_RESULTS) -> List[str]:
+@offload(_network_executor)
+def search_papers(topic: str, max_results: int = DEFAULT_MAX_RESULTS, force_refresh: bool = False) -> List[str]:
     """
     Search for papers on ArXiv based on a topic.
     
     Args:
         topic: The research topic to search for
         max_results: Maximum number of papers to retrieve (default: 5)
+        force_refresh: Query ArXiv even if a cached result is available
     
     Returns:
         List of paper IDs that were found and saved
@@ -32,73 +250,103 @@ def search_papers(topic: str, max_results: int = DEFAULT_MAX_RESULTS) -> List[st
         if max_results <= 0 or max_results > 50:
             max_results = DEFAULT_MAX_RESULTS
         
-        client = arxiv.Client()
-        
-        search = arxiv.Search(
-            query=topic.strip(),
-            max_results=max_results,
-            sort_by=arxiv.SortCriterion.Relevance
-        )
-        
-        papers = client.results(search)
+        query_cache = get_query_cache()
+        query_key = normalize_query(topic, max_results)
+        if not force_refresh:
+            cached_ids = query_cache.get(query_key)
+            if cached_ids is not None:
+                print(f"Search completed. Served {len(cached_ids)} cached papers for topic '{topic}'.", file=sys.stderr)
+                return cached_ids
         
-        # Create directory structure
-        topic_dir = topic.lower().replace(" ", "_").replace("/", "_")
-        path = os.path.join(PAPER_DIR, topic_dir)
-        os.makedirs(path, exist_ok=True)
+        papers_info = _fetch_papers(topic, max_results)
+        paper_ids = list(papers_info)
         
-        # Load existing papers info
-        file_path = os.path.join(path, "papers_info.json")
-        
-        try:
-            with open(file_path, "r", encoding='utf-8') as file:
-                papers_info = json.load(file)
-        except FileNotFoundError:
-            papers_info = {}
-        except json.JSONDecodeError as e:
-            print(f"Warning: Corrupted JSON file {file_path}, creating new one. Error: {e}")
-            papers_info = {}
-        
-        paper_ids = []
-        new_papers_count = 0
-        
-        for paper in papers:
-            paper_id = paper.entry_id.split("/")[-1]
-            paper_ids.append(paper_id)
-            
-            # Skip if paper already exists
-            if paper_id in papers_info:
-                continue
-            
-            # Extract paper information
-            papers_info[paper_id] = {
-                "title": paper.title.strip(),
-                "summary": paper.summary.strip(),
-                "published": paper.published.isoformat() if paper.published else None,
-                "authors": [author.name for author in paper.authors],
-                "pdf_url": paper.pdf_url,
-                "doi": paper.doi,
-                "topic_searched": topic,
-                "arxiv_url": f"https://arxiv.org/abs/{paper_id}"
-            }
-            new_papers_count += 1
-        
-        # Save updated papers info
-        with open(file_path, "w", encoding='utf-8') as file:
-            json.dump(papers_info, file, indent=4, ensure_ascii=False)
+        # Upsert all papers for this topic in one transaction
+        new_papers_count = _save_papers({topic: papers_info})[topic]
+        query_cache.put(query_key, paper_ids)
         
         result_message = f"Search completed. Found {len(paper_ids)} papers for topic '{topic}'. "
-        result_message += f"{new_papers_count} new papers saved to {file_path}"
-        print(result_message)
+        result_message += f"{new_papers_count} new papers saved to {get_store().db_path}"
+        print(result_message, file=sys.stderr)
         
         return paper_ids
         
     except Exception as e:
         error_msg = f"Error searching papers: {str(e)}"
-        print(error_msg)
+        print(error_msg, file=sys.stderr)
         return [error_msg]
 
 @mcp.tool()
+@offload(_network_executor)
+def search_papers_batch(topics: List[str], max_results: int = DEFAULT_MAX_RESULTS, force_refresh: bool = False) -> str:
+    """
+    Search ArXiv for several topics concurrently.
+    
+    Args:
+        topics: The research topics to search for (up to 10)
+        max_results: Maximum number of papers to retrieve per topic (default: 5)
+        force_refresh: Query ArXiv even for topics with a cached result
+    
+    Returns:
+        JSON string mapping each topic to its paper IDs or an error message
+    """
+    try:
+        # Input validation; keep order but drop blanks and duplicates
+        topics = list(dict.fromkeys(t.strip() for t in topics if t and t.strip()))
+        if not topics:
+            return "Error: At least one topic is required"
+        if len(topics) > BATCH_MAX_TOPICS:
+            return f"Error: At most {BATCH_MAX_TOPICS} topics can be searched at once"
+        
+        if max_results <= 0 or max_results > 50:
+            max_results = DEFAULT_MAX_RESULTS
+        
+        query_cache = get_query_cache()
+        results = {}
+        to_fetch = []
+        for topic in topics:
+            cached_ids = None if force_refresh else query_cache.get(normalize_query(topic, max_results))
+            if cached_ids is not None:
+                results[topic] = {"paper_ids": cached_ids, "new_papers": 0, "cached": True}
+            else:
+                to_fetch.append(topic)
+        
+        fetched = {}
+        if to_fetch:
+            with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(to_fetch))) as pool:
+                # Each fetch runs in a copy of this context so its spans join the caller's trace
+                futures = {
+                    topic: pool.submit(contextvars.copy_context().run, _fetch_papers, topic, max_results)
+                    for topic in to_fetch
+                }
+                for topic, future in futures.items():
+                    try:
+                        fetched[topic] = future.result()
+                    except Exception as e:
+                        results[topic] = {"error": f"Error searching papers: {str(e)}"}
+        
+        # One transaction for every topic that succeeded
+        if fetched:
+            new_counts = _save_papers(fetched)
+            for topic, papers_info in fetched.items():
+                paper_ids = list(papers_info)
+                query_cache.put(normalize_query(topic, max_results), paper_ids)
+                results[topic] = {
+                    "paper_ids": paper_ids,
+                    "new_papers": new_counts[topic],
+                    "cached": False
+                }
+        
+        print(f"Batch search completed for {len(topics)} topics: {len(topics) - len(to_fetch)} cached, {len(fetched)} fetched.", file=sys.stderr)
+        return _to_json({topic: results[topic] for topic in topics}, indent=2, ensure_ascii=False)
+        
+    except Exception as e:
+        error_msg = f"Error searching papers: {str(e)}"
+        print(error_msg, file=sys.stderr)
+        return error_msg
+
+@mcp.tool()
+@offload(_local_executor)
 def extract_info(paper_id: str) -> str:
     """
     Extract information for a specific paper ID from saved papers.
@@ -116,88 +364,92 @@ def extract_info(paper_id: str) -> str:
         
         paper_id = paper_id.strip()
         
-        # Check if papers directory exists
-        if not os.path.exists(PAPER_DIR):
-            return f"No papers directory found. Please search for papers first."
-        
-        # Search across all topic directories
-        for item in os.listdir(PAPER_DIR):
-            item_path = os.path.join(PAPER_DIR, item)
-            if os.path.isdir(item_path):
-                file_path = os.path.join(item_path, "papers_info.json")
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, "r", encoding='utf-8') as json_file:
-                            papers_info = json.load(json_file)
-                            if paper_id in papers_info:
-                                return json.dumps(papers_info[paper_id], indent=2, ensure_ascii=False)
-                    except (FileNotFoundError, json.JSONDecodeError) as e:
-                        print(f"Warning: Error reading {file_path}: {str(e)}")
-                        continue
+        paper_data = get_cache().get_paper(paper_id)
+        if paper_data is not None:
+            return _to_json(paper_data, indent=2, ensure_ascii=False)
         
         return f"No information found for paper ID: {paper_id}. Please search for papers containing this ID first."
         
     except Exception as e:
         error_msg = f"Error extracting paper info: {str(e)}"
-        print(error_msg)
+        print(error_msg, file=sys.stderr)
         return error_msg
 
+def _encode_cursor(topic: Optional[str], sort: str, after) -> str:
+    payload = json.dumps({"t": topic_key(topic) if topic else None, "s": sort, "k": list(after)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, topic: Optional[str], sort: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        after = tuple(payload["k"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if payload.get("t") != (topic_key(topic) if topic else None) or payload.get("s") != sort:
+        raise ValueError("Cursor does not match the topic and sort of this listing")
+    return after
+
 @mcp.tool()
-def list_saved_papers(topic: Optional[str] = None) -> str:
+@offload(_local_executor)
+def list_saved_papers(
+    topic: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    sort: str = "id"
+) -> str:
     """
-    List all saved papers, optionally filtered by topic.
+    List saved papers one page at a time, optionally filtered by topic.
     
     Args:
         topic: Optional topic to filter by
+        limit: Maximum number of papers per page (default: 50, max: 500)
+        cursor: Opaque cursor from a previous page's next_cursor
+        fields: Paper fields to include (default: title, authors, published, topic_searched, arxiv_url)
+        sort: "id", "published_desc" or "published_asc" (default: "id")
     
     Returns:
-        JSON string with list of saved papers
+        Compact JSON string with the papers on this page and the next_cursor (null on the last page)
     """
     try:
-        if not os.path.exists(PAPER_DIR):
-            return "No papers directory found. Please search for papers first."
-        
-        all_papers = {}
-        
-        for item in os.listdir(PAPER_DIR):
-            # Filter by topic if specified
-            if topic and topic.lower().replace(" ", "_") != item.lower():
-                continue
-                
-            item_path = os.path.join(PAPER_DIR, item)
-            if os.path.isdir(item_path):
-                file_path = os.path.join(item_path, "papers_info.json")
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, "r", encoding='utf-8') as json_file:
-                            papers_info = json.load(json_file)
-                            for paper_id, paper_data in papers_info.items():
-                                all_papers[paper_id] = {
-                                    "title": paper_data.get("title", "Unknown"),
-                                    "authors": paper_data.get("authors", []),
-                                    "published": paper_data.get("published", "Unknown"),
-                                    "topic_searched": paper_data.get("topic_searched", item.replace("_", " ")),
-                                    "arxiv_url": paper_data.get("arxiv_url", f"https://arxiv.org/abs/{paper_id}")
-                                }
-                    except (FileNotFoundError, json.JSONDecodeError) as e:
-                        print(f"Warning: Error reading {file_path}: {str(e)}")
-                        continue
-        
-        if not all_papers:
+        if sort not in SORT_ORDERS:
+            return f"Error: Unknown sort '{sort}'. Use one of: {', '.join(SORT_ORDERS)}"
+        
+        if limit <= 0 or limit > MAX_PAGE_SIZE:
+            limit = DEFAULT_PAGE_SIZE
+        
+        fields = fields or DEFAULT_LIST_FIELDS
+        unknown = [field for field in fields if field not in PAPER_FIELDS]
+        if unknown:
+            return f"Error: Unknown fields {unknown}. Use any of: {', '.join(PAPER_FIELDS)}"
+        
+        try:
+            after = _decode_cursor(cursor, topic, sort) if cursor else None
+        except ValueError as e:
+            return f"Error: {str(e)}"
+        
+        papers, next_after = get_cache().list_page(topic, sort, after, limit)
+        
+        if not papers and not cursor:
             filter_msg = f" for topic '{topic}'" if topic else ""
             return f"No saved papers found{filter_msg}."
         
-        return json.dumps({
-            "total_papers": len(all_papers),
-            "papers": all_papers
-        }, indent=2, ensure_ascii=False)
+        return _to_json({
+            "papers": [
+                {"paper_id": paper_id, **{field: paper_data.get(field) for field in fields}}
+                for paper_id, paper_data in papers
+            ],
+            "next_cursor": _encode_cursor(topic, sort, next_after) if next_after else None
+        }, separators=(",", ":"), ensure_ascii=False)
         
     except Exception as e:
         error_msg = f"Error listing papers: {str(e)}"
-        print(error_msg)
+        print(error_msg, file=sys.stderr)
         return error_msg
 
 @mcp.tool()
+@offload(_local_executor)
 def get_paper_summary(paper_id: str) -> str:
     """
     Get just the summary/abstract of a specific paper.
@@ -209,31 +461,248 @@ def get_paper_summary(paper_id: str) -> str:
         The paper's summary or error message
     """
     try:
-        paper_info = extract_info(paper_id)
+        if not paper_id or not paper_id.strip():
+            return "Error: Paper ID cannot be empty"
         
-        # Check if it's an error message
-        if paper_info.startswith("Error:") or paper_info.startswith("No information"):
-            return paper_info
+        paper_id = paper_id.strip()
+        paper_data = get_cache().get_paper(paper_id)
+        if paper_data is None:
+            return f"No information found for paper ID: {paper_id}. Please search for papers containing this ID first."
         
-        # Parse the JSON and extract summary
-        paper_data = json.loads(paper_info)
-        summary = paper_data.get("summary", "No summary available")
-        title = paper_data.get("title", "Unknown Title")
+        summary = paper_data.get("summary") or "No summary available"
+        title = paper_data.get("title") or "Unknown Title"
         
         return f"Title: {title}\n\nSummary: {summary}"
         
-    except json.JSONDecodeError:
-        return "Error: Invalid paper information format"
     except Exception as e:
         return f"Error retrieving summary: {str(e)}"
 
+@mcp.tool()
+@offload(_local_executor)
+def search_local_papers(query: str, k: int = 10) -> str:
+    """
+    Full-text search over already saved papers, without contacting ArXiv.
+    
+    Args:
+        query: Free-text query matched against titles, summaries and authors
+        k: Maximum number of results to return (default: 10)
+    
+    Returns:
+        JSON string with ranked paper IDs, titles and relevance scores
+    """
+    try:
+        if not query or not query.strip():
+            return "Error: Query cannot be empty"
+        
+        if k <= 0 or k > 100:
+            k = 10
+        
+        cache = get_cache()
+        results = []
+        for paper_id, score in get_text_index().search(query, k):
+            paper_data = cache.get_paper(paper_id) or {}
+            results.append({
+                "paper_id": paper_id,
+                "title": paper_data.get("title") or "Unknown",
+                "score": round(score, 4)
+            })
+        
+        if not results:
+            return f"No saved papers match '{query}'. Try search_papers to fetch new papers from ArXiv."
+        
+        return _to_json(results, indent=2, ensure_ascii=False)
+        
+    except Exception as e:
+        error_msg = f"Error searching saved papers: {str(e)}"
+        print(error_msg, file=sys.stderr)
+        return error_msg
+
+@mcp.tool()
+@offload(_local_executor)
+def find_related_papers(paper_id: str, k: int = 5) -> str:
+    """
+    Find saved papers most similar to a given saved paper (TF-IDF over titles and summaries).
+    
+    Args:
+        paper_id: The ArXiv paper ID to find related papers for
+        k: Maximum number of related papers to return (default: 5)
+    
+    Returns:
+        JSON string with related paper IDs, titles and cosine similarity scores
+    """
+    try:
+        if not paper_id or not paper_id.strip():
+            return "Error: Paper ID cannot be empty"
+        
+        paper_id = paper_id.strip()
+        if k <= 0 or k > 50:
+            k = 5
+        
+        index = get_related_index()
+        if paper_id not in index:
+            return f"No information found for paper ID: {paper_id}. Please search for papers containing this ID first."
+        
+        cache = get_cache()
+        results = []
+        for related_id, score in index.related(paper_id, k):
+            paper_data = cache.get_paper(related_id) or {}
+            results.append({
+                "paper_id": related_id,
+                "title": paper_data.get("title") or "Unknown",
+                "score": round(score, 4)
+            })
+        
+        if not results:
+            return f"No related papers found among saved papers for {paper_id}."
+        
+        return _to_json(results, indent=2, ensure_ascii=False)
+        
+    except Exception as e:
+        error_msg = f"Error finding related papers: {str(e)}"
+        print(error_msg, file=sys.stderr)
+        return error_msg
+
+async def _ensure_pdfs(paper_ids: List[str]) -> Dict[str, Dict]:
+    """Download and extract PDFs for saved papers that don't have text yet."""
+    results = {}
+    pdf_urls = {}
+    for paper_id in paper_ids:
+        paper_data = get_cache().get_paper(paper_id)
+        if paper_data is None:
+            results[paper_id] = {"error": "Paper not found. Please search for papers containing this ID first."}
+        elif not paper_data.get("pdf_url"):
+            results[paper_id] = {"error": "No PDF URL stored for this paper"}
+        else:
+            pdf_urls[paper_id] = paper_data["pdf_url"]
+    
+    if pdf_urls:
+        results.update(await fetch_and_extract(get_pdf_store(), pdf_urls, concurrency=PDF_DOWNLOAD_CONCURRENCY))
+    return {paper_id: results[paper_id] for paper_id in paper_ids}
+
+@mcp.tool()
+async def fetch_paper_pdfs(paper_ids: List[str]) -> str:
+    """
+    Download the full-text PDFs of saved papers and index their text.
+    
+    Args:
+        paper_ids: ArXiv paper IDs of saved papers (up to 20)
+    
+    Returns:
+        JSON string mapping each paper ID to its number of text chunks or an error message
+    """
+    try:
+        paper_ids = list(dict.fromkeys(p.strip() for p in paper_ids if p and p.strip()))
+        if not paper_ids:
+            return "Error: At least one paper ID is required"
+        if len(paper_ids) > PDF_BATCH_MAX_PAPERS:
+            return f"Error: At most {PDF_BATCH_MAX_PAPERS} papers can be fetched at once"
+        
+        return _to_json(await _ensure_pdfs(paper_ids), indent=2)
+        
+    except Exception as e:
+        error_msg = f"Error fetching PDFs: {str(e)}"
+        print(error_msg, file=sys.stderr)
+        return error_msg
+
+@mcp.tool()
+async def get_paper_chunk(paper_id: str, section_or_range: str = "0") -> str:
+    """
+    Read part of a paper's full text, downloading the PDF first if needed.
+    
+    Args:
+        paper_id: The ArXiv paper ID
+        section_or_range: A section name (e.g. "introduction"), a chunk index (e.g. "2"),
+            or a byte range of the extracted text (e.g. "0-4000")
+    
+    Returns:
+        JSON string with the text slice, its offsets and the paper's section list
+    """
+    try:
+        if not paper_id or not paper_id.strip():
+            return "Error: Paper ID cannot be empty"
+        
+        paper_id = paper_id.strip()
+        pdf_store = get_pdf_store()
+        # Store lookups and the text read touch SQLite and disk; keep them off the event loop
+        if not await asyncio.to_thread(pdf_store.has_text, paper_id):
+            result = (await _ensure_pdfs([paper_id]))[paper_id]
+            if "error" in result:
+                return f"Error: Could not fetch PDF for {paper_id}: {result['error']}"
+        
+        chunks = await asyncio.to_thread(pdf_store.list_chunks, paper_id)
+        selector = (section_or_range or "0").strip().lower()
+        
+        range_match = re.fullmatch(r"(\d+)\s*-\s*(\d+)", selector)
+        if range_match:
+            start, end = int(range_match.group(1)), int(range_match.group(2))
+            section = None
+        elif selector.isdigit():
+            index = int(selector)
+            if index >= len(chunks):
+                return f"Error: Chunk index {index} out of range; paper has {len(chunks)} chunks"
+            start, end, section = chunks[index]["start"], chunks[index]["end"], chunks[index]["section"]
+        else:
+            matching = [chunk for chunk in chunks if chunk["section"] == selector]
+            if not matching:
+                sections = sorted({chunk["section"] for chunk in chunks if chunk["section"]})
+                return f"Error: Section '{selector}' not found. Available sections: {', '.join(sections) or 'none'}"
+            start, end, section = matching[0]["start"], matching[-1]["end"], selector
+        
+        end = min(end, start + MAX_SLICE_BYTES)
+        start, end, text = await asyncio.to_thread(pdf_store.read_slice, paper_id, start, end)
+        
+        return _to_json({
+            "paper_id": paper_id,
+            "section": section,
+            "start": start,
+            "end": end,
+            "total_chunks": len(chunks),
+            "sections": list(dict.fromkeys(chunk["section"] for chunk in chunks if chunk["section"])),
+            "text": text
+        }, indent=2, ensure_ascii=False)
+        
+    except Exception as e:
+        error_msg = f"Error reading paper text: {str(e)}"
+        print(error_msg, file=sys.stderr)
+        return error_msg
+
+@mcp.tool()
+@offload(_local_executor)
+def get_cache_stats() -> str:
+    """
+    Get hit/miss counters and sizes of the paper cache and ArXiv query cache.
+    
+    Returns:
+        JSON string with cache statistics
+    """
+    return _to_json({
+        "paper_cache": get_cache().stats(),
+        "query_cache": get_query_cache().stats()
+    }, indent=2)
+
+install_telemetry(mcp)
+
+async def shutdown():
+    """Finish running tools, then checkpoint the paper store and close every cache and store."""
+    await asyncio.to_thread(_network_executor.shutdown, wait=True)
+    await asyncio.to_thread(_local_executor.shutdown, wait=True)
+    with _init_lock:
+        for resource in (_store, _query_cache, _pdf_store):
+            if resource is not None:
+                try:
+                    resource.close()
+                except Exception as e:
+                    print(f"Error closing {type(resource).__name__}: {e}", file=sys.stderr)
 
 def main():
-    print("Starting ArXiv Research MCP Server...")
+    args = parse_server_args("ArXiv Research MCP Server", HTTP_PORT)
+    print("Starting ArXiv Research MCP Server...", file=sys.stderr)
     try:
-        mcp.run(transport='stdio')
+        asyncio.run(serve(mcp, args, shutdown))
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
-        print(f"Error running server: {e}")
+        print(f"Error running server: {e}", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Offline tests for the PDF pipeline: fixtures/paper.pdf is served by a local
+aiohttp stand-in for arxiv.org, and the research server's stores live in a
+temporary directory.
+"""
+import asyncio
+import json
+import os
+
+import pytest
+from aiohttp import web
+
+import research_server
+from utils.paper_cache import PaperCache
+from utils.paper_store import PaperStore
+from utils.pdf_pipeline import PdfStore
+
+FIXTURE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "paper.pdf")
+PAPER_ID = "2401.00001v1"
+OTHER_ID = "2401.00002v1"
+
+
+class PdfServer:
+    """Serves the fixture PDF at /pdf/<paper ID> and counts the downloads."""
+
+    def __init__(self):
+        with open(FIXTURE_PDF, "rb") as f:
+            self.pdf = f.read()
+        self.downloads = 0
+        self._runner = None
+        self.url = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.downloads += 1
+        return web.Response(body=self.pdf, content_type="application/pdf")
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/pdf/{paper_id}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{self._runner.addresses[0][1]}/pdf"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+@pytest.fixture
+def research(tmp_path, monkeypatch):
+    """The research server's module state, pointed at empty stores under tmp_path."""
+    store = PaperStore(str(tmp_path / "papers.db"))
+    pdf_store = PdfStore(str(tmp_path / "pdfs"))
+    monkeypatch.setattr(research_server, "_store", store)
+    monkeypatch.setattr(research_server, "_cache", PaperCache(store))
+    monkeypatch.setattr(research_server, "_pdf_store", pdf_store)
+    yield research_server
+    pdf_store.close()
+    store.close()
+
+
+def save_papers(research, base_url: str, *paper_ids: str):
+    research.get_store().upsert_batch({
+        "caching": {
+            paper_id: {
+                "title": f"Paper {paper_id}",
+                "summary": "A fixture paper.",
+                "published": "2024-01-01T00:00:00+00:00",
+                "authors": ["Author"],
+                "pdf_url": f"{base_url}/{paper_id}",
+                "doi": None,
+                "topic_searched": "caching",
+                "arxiv_url": f"https://arxiv.org/abs/{paper_id}",
+            }
+            for paper_id in paper_ids
+        }
+    })
+
+
+async def get_chunk(research, paper_id: str, selector: str):
+    result = await research.get_paper_chunk.fn(paper_id, selector)
+    assert not result.startswith("Error"), result
+    return json.loads(result)
+
+
+def test_fetch_paper_pdfs_downloads_once(research):
+    async def scenario():
+        async with PdfServer() as server:
+            save_papers(research, server.url, PAPER_ID, OTHER_ID)
+            first = json.loads(await research.fetch_paper_pdfs.fn([PAPER_ID, OTHER_ID, "9999.99999"]))
+            again = json.loads(await research.fetch_paper_pdfs.fn([PAPER_ID]))
+            return server.downloads, first, again
+
+    downloads, first, again = asyncio.run(scenario())
+    assert first[PAPER_ID] == {"chunks": 4, "cached": False}
+    assert first[OTHER_ID] == {"chunks": 4, "cached": False}
+    assert "error" in first["9999.99999"]
+    assert again[PAPER_ID] == {"chunks": 4, "cached": True}
+    assert downloads == 2
+    # Both papers have the same bytes, so one stored copy serves both
+    pdf_store = research.get_pdf_store()
+    assert pdf_store.sha_for_paper(PAPER_ID) == pdf_store.sha_for_paper(OTHER_ID)
+
+
+def test_get_paper_chunk_selectors(research):
+    async def scenario():
+        async with PdfServer() as server:
+            save_papers(research, server.url, PAPER_ID)
+            # The first read fetches the PDF; later ones reuse the extracted text
+            by_section = await get_chunk(research, PAPER_ID, "Introduction")
+            by_index = await get_chunk(research, PAPER_ID, "2")
+            by_range = await get_chunk(research, PAPER_ID, "0-8")
+            return server.downloads, by_section, by_index, by_range
+
+    downloads, by_section, by_index, by_range = asyncio.run(scenario())
+    assert downloads == 1
+    assert by_section["section"] == "introduction"
+    assert by_section["text"].startswith("1 Introduction\nFull-text access")
+    assert by_section["sections"] == ["abstract", "introduction", "methods", "results"]
+    assert by_index["section"] == "methods"
+    assert by_index["text"].startswith("2 Methods\n")
+    assert by_range["section"] is None
+    assert (by_range["start"], by_range["end"], by_range["text"]) == (0, 8, "Abstract")
+
+
+def test_get_paper_chunk_errors(research):
+    async def scenario():
+        async with PdfServer() as server:
+            save_papers(research, server.url, PAPER_ID)
+            return (
+                await research.get_paper_chunk.fn(PAPER_ID, "appendix"),
+                await research.get_paper_chunk.fn(PAPER_ID, "7"),
+                await research.get_paper_chunk.fn("9999.99999", "0"),
+            )
+
+    missing_section, missing_index, unknown_paper = asyncio.run(scenario())
+    assert missing_section.startswith("Error: Section 'appendix' not found")
+    assert missing_index == "Error: Chunk index 7 out of range; paper has 4 chunks"
+    assert unknown_paper.startswith("Error: Could not fetch PDF for 9999.99999")
+
+
+def test_read_slice_snaps_to_utf8_boundaries(research):
+    async def scenario():
+        async with PdfServer() as server:
+            save_papers(research, server.url, PAPER_ID)
+            await research.fetch_paper_pdfs.fn([PAPER_ID])
+
+    asyncio.run(scenario())
+    pdf_store = research.get_pdf_store()
+    with open(pdf_store.text_path(pdf_store.sha_for_paper(PAPER_ID)), "rb") as f:
+        text = f.read()
+    accent = text.index("é".encode("utf-8"))
+
+    # A range starting inside the two-byte "é" skips it
+    start, end, sliced = pdf_store.read_slice(PAPER_ID, accent + 1, accent + 6)
+    assert (start, end, sliced) == (accent + 2, accent + 6, " of ")
+    # A range ending inside it stops before it
+    start, end, sliced = pdf_store.read_slice(PAPER_ID, accent - 3, accent + 1)
+    assert (start, end, sliced) == (accent - 3, accent, "caf")
+    # A range inside one character is empty
+    assert pdf_store.read_slice(PAPER_ID, accent + 1, accent + 2)[2] == ""
+    # Ranges past the end are clamped to the text
+    start, end, sliced = pdf_store.read_slice(PAPER_ID, len(text) - 6, len(text) + 100)
+    assert (end, sliced) == (len(text), "twice.")
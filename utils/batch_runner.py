@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Dict, Iterator, Optional, TextIO, Tuple
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_QUERY_FIELD = "query"
+
+
+def iter_queries(path: str, field: str = DEFAULT_QUERY_FIELD) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yield (index, record) for each non-blank line of a JSONL file, reading lazily.
+
+    A line may be a JSON object holding the query under `field`, or a bare
+    JSON string. Lines that can't be used become records with an "error".
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield index, {"error": f"Invalid JSON: {e}"}
+            else:
+                if isinstance(value, str):
+                    yield index, {"query": value}
+                elif isinstance(value, dict) and isinstance(value.get(field), str):
+                    yield index, {**value, "query": value[field]}
+                else:
+                    yield index, {"error": f"No '{field}' string in line"}
+            index += 1
+
+
+async def run_batch(
+    process_query: Callable[[str], Awaitable[str]],
+    input_path: str,
+    output: TextIO,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    field: str = DEFAULT_QUERY_FIELD,
+    id_field: Optional[str] = None,
+) -> Dict:
+    """
+    Run every query in a JSONL file through process_query, at most `concurrency` at a time.
+
+    Input is read as workers free up, so the file is never held in memory.
+    Each result is written to `output` as a JSON line as soon as it finishes
+    (completion order), tagged with the query's original index.
+
+    Returns a summary with counts and the total wall time.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    summary = {"queries": 0, "succeeded": 0, "failed": 0}
+    started = time.perf_counter()
+
+    def write(result: Dict):
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+        summary["queries"] += 1
+        summary["failed" if "error" in result else "succeeded"] += 1
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, record, queued_at = item
+            result = {"index": index}
+            if id_field and id_field in record:
+                result["id"] = record[id_field]
+            if "error" in record:
+                result["error"] = record["error"]
+                write(result)
+                continue
+
+            result["query"] = record["query"]
+            begin = time.perf_counter()
+            try:
+                result["response"] = await process_query(record["query"])
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+            end = time.perf_counter()
+            result["queued_seconds"] = round(begin - queued_at, 4)
+            result["elapsed_seconds"] = round(end - begin, 4)
+            write(result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for index, record in iter_queries(input_path, field):
+            await queue.put((index, record, time.perf_counter()))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+
+    summary["wall_seconds"] = round(time.perf_counter() - started, 4)
+    return summary
@@ -1,36 +1,209 @@
+import asyncio
 import os
-from typing import Optional, Dict
+import time
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from utils.response_cache import ResponseCache, response_key
+from utils.telemetry import span, start_span
+
+DEFAULT_MODEL_NAME = "gemini-2.0-flash"
+
+# Mock responses without explicit chunks are streamed in pieces of this size
+MOCK_CHUNK_CHARS = 16
+
 
 class GeminiClientWrapper:
-    """Wrapper for the Gemini client to handle generation requests."""
+    """
+    Wrapper for the Gemini client to handle generation requests.
+
+    With a ResponseCache, complete responses are stored under a hash of the
+    model, prompt and generation config; pass use_cache=False to skip the
+    lookup for one call (the fresh response still replaces the cached one).
+    """
 
-    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = "gemini-2.0-flash", mock_mode: bool = False):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        mock_mode: bool = False,
+        generation_config: Optional[Dict] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         self.mock_mode = mock_mode
+        self.model_name = model_name or os.getenv("GEMINI_MODEL_NAME", DEFAULT_MODEL_NAME)
+        self.generation_config = generation_config or {}
+        self.cache = cache
 
         if not mock_mode:
             import google.generativeai as genai
 
             if api_key is None:
                 api_key = os.getenv("GEMINI_API_KEY")
-            if model_name is None:
-                model_name = os.getenv("GEMINI_MODEL_NAME", "gemini-pro")
 
             if not api_key:
                 raise ValueError("GEMINI_API_KEY must be set in env or passed directly")
 
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel(model_name)
+            self.model = genai.GenerativeModel(self.model_name, generation_config=self.generation_config or None)
         else:
             self.mock_responses = {}
+            self.mock_responder: Optional[Callable[[str], Optional[Dict]]] = None
 
     def set_mock_response(self, step_id: str, response: Dict):
+        """
+        Script the mock response for a step.
+
+        The response dict holds the full text under "response" and may give
+        explicit stream pieces under "chunks" plus a "chunk_delay" in seconds.
+        """
         if not self.mock_mode:
             raise ValueError("Cannot set mock responses when not in mock mode")
         self.mock_responses[step_id] = response
 
-    def generate_response(self, prompt: str, step_id: Optional[str] = None) -> str:
+    def set_mock_responder(self, responder: Optional[Callable[[str], Optional[Dict]]]):
+        """
+        Script mock responses from the prompt itself: responder(prompt) returns
+        a response dict as for set_mock_response, or None to fall back to the
+        response set for the step.
+        """
+        if not self.mock_mode:
+            raise ValueError("Cannot set mock responses when not in mock mode")
+        self.mock_responder = responder
+
+    def _mock_for(self, prompt: str, step_id: Optional[str]) -> Dict:
+        if self.mock_responder is not None:
+            mock = self.mock_responder(prompt)
+            if mock is not None:
+                return mock
+        return self.mock_responses.get(step_id, {})
+
+    async def _mock_stream(self, prompt: str, step_id: Optional[str]) -> AsyncIterator[str]:
+        mock = self._mock_for(prompt, step_id)
+        text = mock.get("response", "Mocked response")
+        chunks = mock.get("chunks") or [text[i:i + MOCK_CHUNK_CHARS] for i in range(0, len(text), MOCK_CHUNK_CHARS)]
+        delay = mock.get("chunk_delay", 0)
+        for chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
+    def _cache_lookup(self, prompt: str, use_cache: bool):
+        """Return (key, cached response) for a prompt; the key is None when there is no cache."""
+        if self.cache is None:
+            return None, None
+        key = response_key(self.model_name, prompt, self.generation_config)
+        if not use_cache:
+            self.cache.record_bypass()
+            return key, None
+        return key, self.cache.get(key)
+
+    async def _cache_lookup_async(self, prompt: str, use_cache: bool):
+        """_cache_lookup with the disk tier read in a thread, so SQLite doesn't stall the event loop."""
+        if self.cache is None or not use_cache:
+            return self._cache_lookup(prompt, use_cache)
+        key = response_key(self.model_name, prompt, self.generation_config)
+        cached = self.cache.get_memory(key)
+        if cached is None:
+            cached = await asyncio.to_thread(self.cache.get_disk, key)
+        return key, cached
+
+    async def _cache_store_async(self, key: str, response: str):
+        # The memory tier is updated at once, so contains() sees the response before the disk write ends
+        self.cache.put_memory(key, response)
+        await asyncio.to_thread(self.cache.put_disk, key, self.model_name, response)
+
+    async def _model_stream(self, prompt: str, step_id: Optional[str]) -> AsyncIterator[str]:
         if self.mock_mode:
-            return self.mock_responses.get(step_id, {}).get("response", "Mocked response")
-        else:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            async for chunk in self._mock_stream(prompt, step_id):
+                yield chunk
+            return
+
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            # Chunks without text (e.g. safety metadata only) raise on .text
+            try:
+                text = chunk.text
+            except ValueError:
+                continue
+            if text:
+                yield text
+
+    async def stream_response(
+        self, prompt: str, step_id: Optional[str] = None, use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """Yield the response text in chunks as the model produces them, without blocking the event loop."""
+        key, cached = await self._cache_lookup_async(prompt, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        # Not made current: the consumer runs its own work between chunks
+        generate_span = start_span("gemini.generate", model=self.model_name, prompt_chars=len(prompt))
+        started = time.perf_counter()
+        parts = []
+        stream = self._model_stream(prompt, step_id)
+        error = None
+        completed = False
+        try:
+            async for chunk in stream:
+                if not parts:
+                    generate_span.set(first_chunk_ms=round((time.perf_counter() - started) * 1000, 1))
+                parts.append(chunk)
+                yield chunk
+            completed = True
+        except GeneratorExit:
+            # The consumer stopped reading early (e.g. tool calls already dispatched)
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            await stream.aclose()
+            generate_span.set(chunks=len(parts), completed=completed)
+            generate_span.end(error)
+        # Only reached when the response was read to the end, so partial responses are never cached
+        if key is not None:
+            await self._cache_store_async(key, "".join(parts))
+
+    async def cache_response(self, prompt: str, response: str):
+        """
+        Store a response the caller stopped streaming once it had all it needed
+        (e.g. complete tool calls), which stream_response can't tell apart from
+        an abandoned one. A response that was itself served from the cache is
+        not written again.
+        """
+        if self.cache is None:
+            return
+        key = response_key(self.model_name, prompt, self.generation_config)
+        if not self.cache.contains(key):
+            await self._cache_store_async(key, response)
+
+    async def generate_response_async(
+        self,
+        prompt: str,
+        step_id: Optional[str] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+    ) -> str:
+        """Generate a full response, passing each streamed chunk to on_chunk as it arrives."""
+        parts = []
+        async for chunk in self.stream_response(prompt, step_id, use_cache):
+            parts.append(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+        return "".join(parts).strip()
+
+    def generate_response(self, prompt: str, step_id: Optional[str] = None, use_cache: bool = True) -> str:
+        """Blocking generation, for callers outside an event loop."""
+        key, cached = self._cache_lookup(prompt, use_cache)
+        if cached is not None:
+            return cached.strip()
+
+        with span("gemini.generate", model=self.model_name, prompt_chars=len(prompt)):
+            if self.mock_mode:
+                text = self._mock_for(prompt, step_id).get("response", "Mocked response")
+            else:
+                text = self.model.generate_content(prompt).text
+        if key is not None:
+            self.cache.put(key, self.model_name, text)
+        return text if self.mock_mode else text.strip()
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import sys
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from utils.telemetry import span
+
+DEFAULT_CONNECT_TIMEOUT = 30.0
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_IN_FLIGHT = 16
+
+
+def load_server_config(path: str) -> Dict[str, Dict]:
+    """Read the "mcpServers" section of a server config file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("mcpServers", {})
+
+
+class ServerConnection:
+    """
+    One MCP server over stdio, owned by a dedicated task.
+
+    The transport and session context managers are entered and exited inside
+    that task (anyio requires it), so many servers can be started concurrently.
+    """
+
+    def __init__(self, name: str, config: Dict):
+        self.name = name
+        self.params = StdioServerParameters(
+            command=config["command"],
+            args=config.get("args", []),
+            env={**os.environ, **config["env"]} if config.get("env") else None,
+        )
+        self.session: Optional[ClientSession] = None
+        self.tools: List = []
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._closing = asyncio.Event()
+
+    async def start(self, timeout: float = DEFAULT_CONNECT_TIMEOUT):
+        """Launch the server, initialize the session and list its tools."""
+        self._ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(), name=f"mcp-server-{self.name}")
+        try:
+            await asyncio.wait_for(asyncio.shield(self._ready), timeout)
+        except BaseException:
+            self._task.cancel()
+            await self.close()
+            raise
+
+    async def _run(self):
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(stdio_client(self.params))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                response = await session.list_tools()
+
+                self.session = session
+                self.tools = response.tools
+                self._ready.set_result(None)
+                await self._closing.wait()
+        except BaseException as e:
+            if not self._ready.done():
+                self._ready.set_exception(e if isinstance(e, Exception) else ConnectionError(str(e)))
+            elif not isinstance(e, asyncio.CancelledError):
+                print(f"Server '{self.name}' stopped: {e}", file=sys.stderr)
+        finally:
+            self.session = None
+
+    async def close(self):
+        self._closing.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError, Exception):
+                self._task.cancel()
+            self._task = None
+        # Mark a startup failure as retrieved once start() has given up on it
+        if self._ready is not None and self._ready.done() and not self._ready.cancelled():
+            self._ready.exception()
+
+
+class SessionPool:
+    """
+    Connections to one server, shared by every conversation that uses its tools.
+
+    Each call goes to the connection with the fewest calls in flight. At most
+    max_in_flight calls run per connection; further callers wait in FIFO
+    order, so a burst from one conversation can't starve the others.
+    """
+
+    def __init__(self, name: str, config: Dict, size: int = DEFAULT_POOL_SIZE,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.name = name
+        self.connections = [ServerConnection(name, config) for _ in range(max(1, size))]
+        self.max_in_flight = max_in_flight
+        self._in_flight: List[int] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._calls = 0
+        self._waiting = 0
+
+    @property
+    def tools(self) -> List:
+        return self.connections[0].tools if self.connections else []
+
+    async def start(self, timeout: float = DEFAULT_CONNECT_TIMEOUT):
+        """Start the pool's connections concurrently, keeping those that come up."""
+        results = await asyncio.gather(*(c.start(timeout) for c in self.connections), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, BaseException)]
+        self.connections = [c for c, result in zip(self.connections, results) if not isinstance(result, BaseException)]
+        if not self.connections:
+            raise failures[0]
+        if failures:
+            print(f"Warning: Only {len(self.connections)} of {len(results)} connections to '{self.name}' started", file=sys.stderr)
+        self._in_flight = [0] * len(self.connections)
+        self._slots = asyncio.Semaphore(len(self.connections) * self.max_in_flight)
+
+    async def call_tool(self, tool_name: str, arguments: Dict, meta: Optional[Dict] = None):
+        self._waiting += 1
+        try:
+            with span("mcp.pool_wait", server=self.name):
+                await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        index = min(range(len(self.connections)), key=self._in_flight.__getitem__)
+        self._in_flight[index] += 1
+        self._calls += 1
+        try:
+            session = self.connections[index].session
+            if session is None:
+                raise ConnectionError(f"Server '{self.name}' is not connected")
+            return await session.call_tool(tool_name, arguments=arguments, meta=meta)
+        finally:
+            self._in_flight[index] -= 1
+            self._slots.release()
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.connections))
+
+    def stats(self) -> Dict:
+        return {
+            "connections": len(self.connections),
+            "in_flight": sum(self._in_flight),
+            "waiting": self._waiting,
+            "calls": self._calls,
+        }
+
+
+async def connect_pools(config: Dict[str, Dict], size: int = DEFAULT_POOL_SIZE,
+                        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                        timeout: float = DEFAULT_CONNECT_TIMEOUT) -> List[SessionPool]:
+    """
+    Start a session pool for every configured server concurrently.
+
+    A server's "poolSize" entry overrides `size`. Servers that fail or don't
+    come up within the timeout are reported and skipped, so startup takes as
+    long as the slowest healthy server.
+    """
+    pools = [
+        SessionPool(name, server_config, server_config.get("poolSize", size), max_in_flight)
+        for name, server_config in config.items()
+    ]
+    results = await asyncio.gather(*(p.start(timeout) for p in pools), return_exceptions=True)
+
+    connected = []
+    for pool, result in zip(pools, results):
+        if isinstance(result, BaseException):
+            reason = "timed out" if isinstance(result, asyncio.TimeoutError) else str(result) or type(result).__name__
+            print(f"Warning: Could not connect to server '{pool.name}': {reason}", file=sys.stderr)
+        else:
+            connected.append(pool)
+    return connected
@@ -0,0 +1,158 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils.paper_store import PaperStore, topic_key
+
+DEFAULT_MAX_PAPERS = 10000
+DEFAULT_MAX_TOPICS = 64
+
+# Topic part of the page cache key for the "all topics" listing
+ALL_TOPICS = "*"
+
+
+class PaperCache:
+    """Process-wide LRU cache of paper records and per-topic listing pages."""
+
+    def __init__(self, store: PaperStore, max_papers: int = DEFAULT_MAX_PAPERS, max_topics: int = DEFAULT_MAX_TOPICS):
+        self.store = store
+        self.max_papers = max_papers
+        self.max_topics = max_topics
+
+        self._lock = threading.RLock()
+        self._papers: "OrderedDict[str, Dict]" = OrderedDict()
+        self._topics: "OrderedDict[Tuple, Tuple]" = OrderedDict()
+        self._signature = self._file_signature()
+        # Bumped on every invalidation so pages read before a write aren't cached after it
+        self._generation = 0
+        self._stats = {
+            "paper_hits": 0,
+            "paper_misses": 0,
+            "topic_hits": 0,
+            "topic_misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+        store.add_checkpoint_listener(self.notify_checkpoint)
+
+    def _file_signature(self) -> Tuple:
+        """(mtime, size) of the database and its WAL file; changes on any write."""
+        signature = []
+        for path in (self.store.db_path, self.store.db_path + "-wal"):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _check_fresh(self):
+        # Another process (or a manual edit) may have written to the store
+        signature = self._file_signature()
+        if signature != self._signature:
+            self._papers.clear()
+            self._topics.clear()
+            self._signature = signature
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def get_paper(self, paper_id: str) -> Optional[Dict]:
+        """Return a paper record, loading it from the store on a miss."""
+        with self._lock:
+            self._check_fresh()
+            record = self._papers.get(paper_id)
+            if record is not None:
+                self._papers.move_to_end(paper_id)
+                self._stats["paper_hits"] += 1
+                return record
+
+            self._stats["paper_misses"] += 1
+            record = self.store.get_paper(paper_id)
+            if record is not None:
+                self._put(self._papers, paper_id, record, self.max_papers)
+            return record
+
+    def list_page(
+        self,
+        topic: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Tuple[str, Dict]], Optional[Tuple]]:
+        """
+        Return one page of a topic listing (or of all papers).
+
+        Args:
+            topic: Optional topic to filter by
+            sort: Sort order understood by PaperStore.iter_papers
+            after: Sort key of the last paper on the previous page
+            limit: Page size
+
+        Returns:
+            Tuple of ([(paper ID, record), ...], sort key to resume after or
+            None when this is the last page)
+        """
+        key = (topic_key(topic) if topic else ALL_TOPICS, sort, after, limit)
+        with self._lock:
+            self._check_fresh()
+            page = self._topics.get(key)
+            if page is not None:
+                self._topics.move_to_end(key)
+                self._stats["topic_hits"] += 1
+                return page
+
+            self._stats["topic_misses"] += 1
+            generation = self._generation
+
+        # Stream one extra row to learn whether another page follows
+        papers = []
+        next_after = None
+        last_key = None
+        for sort_key, paper_id, record in self.store.iter_papers(topic, sort, after, batch_size=limit + 1):
+            if len(papers) == limit:
+                next_after = last_key
+                break
+            papers.append((paper_id, record))
+            last_key = sort_key
+
+        page = (papers, next_after)
+        with self._lock:
+            if generation == self._generation:
+                self._put(self._topics, key, page, self.max_topics)
+        return page
+
+    def notify_write(self):
+        """
+        Record a write made through this process's store.
+
+        Stored records are never modified once written, so cached papers stay
+        valid; only topic listing pages need to be rebuilt.
+        """
+        with self._lock:
+            self._topics.clear()
+            self._generation += 1
+            self._signature = self._file_signature()
+
+    def notify_checkpoint(self):
+        """
+        Record a checkpoint made by this process's store. It changes the
+        files' size and mtime but no data, so nothing cached is dropped.
+        """
+        with self._lock:
+            self._signature = self._file_signature()
+
+    def _put(self, cache: OrderedDict, key: str, value, limit: int):
+        cache[key] = value
+        while len(cache) > limit:
+            cache.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_papers"] = len(self._papers)
+            stats["cached_topics"] = len(self._topics)
+            stats["max_papers"] = self.max_papers
+            stats["max_topics"] = self.max_topics
+            return stats
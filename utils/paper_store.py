@@ -0,0 +1,326 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Writes append to the WAL and are folded into the database by the background
+# compactor; this high autocheckpoint is only a backstop if it isn't running
+WAL_AUTOCHECKPOINT_PAGES = 10000
+DEFAULT_COMPACT_INTERVAL = 30.0
+DEFAULT_COMPACT_MIN_WAL_BYTES = 1 << 20
+
+# Columns stored for every paper, in the order used by the papers table
+PAPER_FIELDS = [
+    "title",
+    "summary",
+    "published",
+    "authors",
+    "pdf_url",
+    "doi",
+    "topic_searched",
+    "arxiv_url",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    paper_id TEXT PRIMARY KEY,
+    title TEXT,
+    summary TEXT,
+    published TEXT,
+    authors TEXT,
+    pdf_url TEXT,
+    doi TEXT,
+    topic_searched TEXT,
+    arxiv_url TEXT
+);
+CREATE TABLE IF NOT EXISTS paper_topics (
+    topic TEXT NOT NULL,
+    paper_id TEXT NOT NULL REFERENCES papers(paper_id),
+    PRIMARY KEY (topic, paper_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_paper_topics_paper ON paper_topics(paper_id);
+CREATE INDEX IF NOT EXISTS idx_papers_published ON papers(COALESCE(published, ''), paper_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Sort orders for iter_papers: published date ties are broken by paper ID
+PUBLISHED_KEY = "COALESCE(p.published, '')"
+SORT_ORDERS = {
+    "id": "p.paper_id ASC",
+    "published_desc": f"{PUBLISHED_KEY} DESC, p.paper_id ASC",
+    "published_asc": f"{PUBLISHED_KEY} ASC, p.paper_id ASC",
+}
+
+
+def topic_key(topic: str) -> str:
+    """Normalize a search topic the same way the legacy topic directories were named."""
+    return topic.strip().lower().replace(" ", "_").replace("/", "_")
+
+
+def _row_to_record(row: sqlite3.Row) -> Dict:
+    record = {field: row[field] for field in PAPER_FIELDS}
+    record["authors"] = json.loads(record["authors"]) if record["authors"] else []
+    return record
+
+
+class PaperStore:
+    """SQLite-backed paper metadata store keyed by paper ID."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # One shared connection; tools may be called from worker threads
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES}")
+        self._conn.executescript(SCHEMA)
+
+        self._compactor: Optional[threading.Thread] = None
+        self._stop_compactor = threading.Event()
+        self._checkpoint_listeners: List[Callable[[], None]] = []
+
+    def close(self):
+        self.stop_compactor()
+        with self._lock:
+            self.checkpoint()
+            self._conn.close()
+
+    def wal_size(self) -> int:
+        try:
+            return os.path.getsize(self.db_path + "-wal")
+        except FileNotFoundError:
+            return 0
+
+    def checkpoint(self) -> bool:
+        """
+        Fold the write-ahead log into the main database file and truncate it.
+
+        Returns:
+            True if the whole log was checkpointed, False if readers or
+            writers kept part of it busy
+        """
+        with self._lock:
+            busy, _, _ = self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        # Called outside the store lock: listeners may hold their own lock while reading the store
+        for listener in list(self._checkpoint_listeners):
+            listener()
+        return busy == 0
+
+    def add_checkpoint_listener(self, listener: Callable[[], None]):
+        """Call listener after each checkpoint, which rewrites the files without changing any data."""
+        self._checkpoint_listeners.append(listener)
+
+    def start_compactor(self, interval: float = DEFAULT_COMPACT_INTERVAL, min_wal_bytes: int = DEFAULT_COMPACT_MIN_WAL_BYTES):
+        """
+        Start a daemon thread that checkpoints the WAL once it grows past min_wal_bytes.
+
+        Commits then only pay for appending to the log (fsynced at checkpoint
+        time under synchronous=NORMAL) rather than for checkpointing inline.
+        """
+        if self._compactor is not None:
+            return
+        self._stop_compactor.clear()
+
+        def run():
+            while not self._stop_compactor.wait(interval):
+                if self.wal_size() < min_wal_bytes:
+                    continue
+                try:
+                    self.checkpoint()
+                except sqlite3.Error as e:
+                    print(f"Warning: Paper store compaction failed: {str(e)}", file=sys.stderr)
+
+        self._compactor = threading.Thread(target=run, name="paper-store-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        if self._compactor is None:
+            return
+        self._stop_compactor.set()
+        self._compactor.join()
+        self._compactor = None
+
+    def upsert_batch(self, papers_by_topic: Dict[str, Dict[str, Dict]]) -> Dict[str, int]:
+        """
+        Save the results of several topic searches in one transaction.
+
+        Args:
+            papers_by_topic: Mapping of topic to {paper ID: paper record}
+
+        Returns:
+            Mapping of topic to number of papers newly linked to it
+        """
+        new_links = {}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for topic, papers in papers_by_topic.items():
+                    new_links[topic] = self._upsert_locked(topic_key(topic), papers)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return new_links
+
+    def _upsert_locked(self, key: str, papers: Dict[str, Dict]) -> int:
+        self._conn.executemany(
+            f"INSERT OR IGNORE INTO papers (paper_id, {', '.join(PAPER_FIELDS)}) "
+            f"VALUES (?, {', '.join('?' * len(PAPER_FIELDS))})",
+            [
+                (paper_id, *[
+                    json.dumps(data.get(field) or [], ensure_ascii=False) if field == "authors" else data.get(field)
+                    for field in PAPER_FIELDS
+                ])
+                for paper_id, data in papers.items()
+            ],
+        )
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO paper_topics (topic, paper_id) VALUES (?, ?)",
+            [(key, paper_id) for paper_id in papers],
+        )
+        return self._conn.total_changes - before
+
+    def get_paper(self, paper_id: str) -> Optional[Dict]:
+        """Return the stored record for a paper ID, or None if it is unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        return _row_to_record(row) if row else None
+
+    def list_papers(self, topic: Optional[str] = None) -> Dict[str, Dict]:
+        """Return all saved papers, optionally restricted to one topic."""
+        with self._lock:
+            if topic:
+                rows = self._conn.execute(
+                    "SELECT p.* FROM papers p JOIN paper_topics t ON t.paper_id = p.paper_id "
+                    "WHERE t.topic = ? ORDER BY p.paper_id",
+                    (topic_key(topic),),
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM papers ORDER BY paper_id").fetchall()
+        return {row["paper_id"]: _row_to_record(row) for row in rows}
+
+    def iter_papers(
+        self,
+        topic: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple] = None,
+        batch_size: int = 256,
+    ) -> Iterator[Tuple[Tuple, str, Dict]]:
+        """
+        Stream saved papers in a stable order using keyset pagination.
+
+        The store lock is only held while each batch is fetched, so a slow
+        consumer doesn't block other tool calls.
+
+        Args:
+            topic: Optional topic to filter by
+            sort: One of SORT_ORDERS
+            after: Resume after this sort key (as yielded by a previous call)
+            batch_size: Rows fetched from SQLite per round trip
+
+        Yields:
+            Tuples of (sort key, paper ID, paper record)
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order '{sort}'. Use one of: {', '.join(SORT_ORDERS)}")
+
+        select = f"SELECT p.*, {PUBLISHED_KEY} AS published_key FROM papers p"
+        base_params: list = []
+        if topic:
+            select += " JOIN paper_topics t ON t.paper_id = p.paper_id WHERE t.topic = ?"
+            base_params.append(topic_key(topic))
+        else:
+            select += " WHERE 1"
+
+        while True:
+            query = select
+            params = list(base_params)
+            if after is not None:
+                if sort == "id":
+                    query += " AND p.paper_id > ?"
+                    params.append(after[0])
+                else:
+                    op = "<" if sort == "published_desc" else ">"
+                    query += f" AND ({PUBLISHED_KEY} {op} ? OR ({PUBLISHED_KEY} = ? AND p.paper_id > ?))"
+                    params.extend([after[0], after[0], after[1]])
+            query += f" ORDER BY {SORT_ORDERS[sort]} LIMIT ?"
+            params.append(batch_size)
+
+            with self._lock:
+                rows = self._conn.execute(query, params).fetchall()
+            for row in rows:
+                after = (row["paper_id"],) if sort == "id" else (row["published_key"], row["paper_id"])
+                yield after, row["paper_id"], _row_to_record(row)
+            if len(rows) < batch_size:
+                return
+
+    def migrate_from_json(self, paper_dir: str) -> Tuple[int, int]:
+        """
+        One-shot import of the legacy papers/<topic>/papers_info.json layout.
+
+        The migration is recorded in the meta table so it only runs once per
+        store. Legacy files are left untouched on disk.
+
+        Args:
+            paper_dir: Directory holding the legacy topic directories
+
+        Returns:
+            Tuple of (topics imported, topic links created)
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_migrated'"
+            ).fetchone()
+            if done or not os.path.isdir(paper_dir):
+                return 0, 0
+
+            topics = 0
+            links = 0
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for item, papers_info in _iter_legacy_topics(paper_dir):
+                    links += self._upsert_locked(item, papers_info)
+                    topics += 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', '1')"
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if topics:
+            print(f"Migrated {links} papers from {topics} topic directories into {self.db_path}", file=sys.stderr)
+        return topics, links
+
+
+def _iter_legacy_topics(paper_dir: str) -> Iterable[Tuple[str, Dict[str, Dict]]]:
+    for item in sorted(os.listdir(paper_dir)):
+        file_path = os.path.join(paper_dir, item, "papers_info.json")
+        if not os.path.isfile(file_path):
+            continue
+        try:
+            with open(file_path, "r", encoding='utf-8') as json_file:
+                papers_info = json.load(json_file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Skipping unreadable {file_path}: {str(e)}", file=sys.stderr)
+            continue
+        # Older files may lack topic_searched; fall back to the directory name
+        for paper_id, paper_data in papers_info.items():
+            paper_data.setdefault("topic_searched", item.replace("_", " "))
+            paper_data.setdefault("arxiv_url", f"https://arxiv.org/abs/{paper_id}")
+        yield topic_key(item), papers_info
@@ -0,0 +1,261 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import ClientSession, ClientTimeout
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_CHUNK_CHARS = 4000
+MAX_SLICE_BYTES = 16000
+MAX_PDF_BYTES = 50 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS paper_pdfs (
+    paper_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    sha256 TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    section TEXT,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    PRIMARY KEY (sha256, idx)
+) WITHOUT ROWID;
+"""
+
+# Lines treated as section headings, e.g. "Abstract", "1 Introduction", "3.2 Results"
+HEADING_RE = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*\.?\s+)?"
+    r"(abstract|introduction|background|related work|method|methods|methodology|approach|"
+    r"experiments?|evaluation|results|discussion|conclusions?|limitations|references|acknowledge?ments|appendix)"
+    r"\s*$",
+    re.IGNORECASE,
+)
+
+
+def extract_pdf_text(pdf_path: str) -> str:
+    """Extract plain text from a PDF, one page after another."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("pypdf is required for PDF text extraction. Install it with 'pip install pypdf'.")
+
+    reader = PdfReader(pdf_path)
+    return "\n\n".join((page.extract_text() or "").strip() for page in reader.pages)
+
+
+def chunk_text(text: str, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> List[Tuple[Optional[str], int, int]]:
+    """
+    Split extracted text into chunks that start at section headings or size limits.
+
+    Returns:
+        List of (section name, start byte, end byte) into the UTF-8 encoded text
+    """
+    chunks = []
+    section = None
+    chunk_start = 0
+    chunk_len = 0
+    offset = 0
+
+    for line in text.splitlines(keepends=True):
+        size = len(line.encode("utf-8"))
+        heading = HEADING_RE.match(line)
+        if (heading or chunk_len >= chunk_chars) and offset > chunk_start:
+            chunks.append((section, chunk_start, offset))
+            chunk_start = offset
+            chunk_len = 0
+        if heading:
+            section = heading.group(1).lower()
+        offset += size
+        chunk_len += len(line)
+
+    if offset > chunk_start:
+        chunks.append((section, chunk_start, offset))
+    return chunks
+
+
+class PdfStore:
+    """Content-addressed PDF and extracted-text storage with a chunk offset index."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "text"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def pdf_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], f"{sha256}.pdf")
+
+    def text_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "text", f"{sha256}.txt")
+
+    def sha_for_paper(self, paper_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM paper_pdfs WHERE paper_id = ?", (paper_id,)).fetchone()
+        return row[0] if row else None
+
+    def has_text(self, paper_id: str) -> bool:
+        sha256 = self.sha_for_paper(paper_id)
+        return sha256 is not None and os.path.isfile(self.text_path(sha256))
+
+    def add_pdf(self, paper_id: str, data: bytes) -> str:
+        """Store PDF bytes under their SHA-256 and link them to a paper ID."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.pdf_path(sha256)
+        if not os.path.isfile(path):
+            _atomic_write(path, data)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO paper_pdfs (paper_id, sha256) VALUES (?, ?)", (paper_id, sha256)
+            )
+        return sha256
+
+    def extract(self, sha256: str, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> int:
+        """
+        Extract text for a stored PDF once and index its chunks.
+
+        Returns:
+            Number of chunks indexed
+        """
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM chunks WHERE sha256 = ?", (sha256,)).fetchone()[0]
+        if count and os.path.isfile(self.text_path(sha256)):
+            return count
+
+        text = extract_pdf_text(self.pdf_path(sha256))
+        _atomic_write(self.text_path(sha256), text.encode("utf-8"))
+        chunks = chunk_text(text, chunk_chars)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM chunks WHERE sha256 = ?", (sha256,))
+                self._conn.executemany(
+                    "INSERT INTO chunks (sha256, idx, section, start_offset, end_offset) VALUES (?, ?, ?, ?, ?)",
+                    [(sha256, idx, section, start, end) for idx, (section, start, end) in enumerate(chunks)],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(chunks)
+
+    def list_chunks(self, paper_id: str) -> List[Dict]:
+        sha256 = self.sha_for_paper(paper_id)
+        if sha256 is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, section, start_offset, end_offset FROM chunks WHERE sha256 = ? ORDER BY idx", (sha256,)
+            ).fetchall()
+        return [{"index": idx, "section": section, "start": start, "end": end} for idx, section, start, end in rows]
+
+    def read_slice(self, paper_id: str, start: int, end: int) -> Tuple[int, int, str]:
+        """
+        Read bytes [start, end) of a paper's extracted text through a memory map.
+
+        The range is narrowed to whole UTF-8 characters, so a character split
+        by either offset is left out rather than garbled.
+
+        Returns:
+            Tuple of (start, end, text) for the range actually read
+        """
+        sha256 = self.sha_for_paper(paper_id)
+        if sha256 is None:
+            raise KeyError(paper_id)
+        with open(self.text_path(sha256), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            start = max(0, min(start, size))
+            end = max(start, min(end, size, start + MAX_SLICE_BYTES))
+            if start == end:
+                return start, end, ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Continuation bytes look like 0b10xxxxxx; move off them to a character start
+                while start < end and mm[start] & 0xC0 == 0x80:
+                    start += 1
+                while start < end < size and mm[end] & 0xC0 == 0x80:
+                    end -= 1
+                return start, end, mm[start:end].decode("utf-8")
+
+
+def _atomic_write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+async def _download(session: ClientSession, url: str) -> bytes:
+    async with session.get(url) as response:
+        if response.status != 200:
+            raise Exception(f"Error downloading {url}: HTTP {response.status}")
+        data = bytearray()
+        async for block in response.content.iter_chunked(64 * 1024):
+            data.extend(block)
+            if len(data) > MAX_PDF_BYTES:
+                raise Exception(f"PDF at {url} exceeds {MAX_PDF_BYTES} bytes")
+        return bytes(data)
+
+
+async def fetch_and_extract(
+    store: PdfStore,
+    pdf_urls: Dict[str, str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = 60.0,
+) -> Dict[str, Dict]:
+    """
+    Download PDFs concurrently and extract their text.
+
+    Papers whose text is already extracted are skipped. Extraction runs in a
+    worker thread so it doesn't block the event loop.
+
+    Args:
+        store: Where PDFs, text and chunk offsets are kept
+        pdf_urls: Mapping of paper ID to PDF URL
+        concurrency: Maximum number of downloads in flight
+        timeout: Total timeout per download in seconds
+
+    Returns:
+        Mapping of paper ID to {"chunks": n} or {"error": message}
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process(session: ClientSession, paper_id: str, url: str) -> Dict:
+        try:
+            if await asyncio.to_thread(store.has_text, paper_id):
+                chunks = await asyncio.to_thread(store.list_chunks, paper_id)
+                return {"chunks": len(chunks), "cached": True}
+            async with semaphore:
+                data = await _download(session, url)
+            sha256 = await asyncio.to_thread(store.add_pdf, paper_id, data)
+            chunks = await asyncio.to_thread(store.extract, sha256)
+            return {"chunks": chunks, "cached": False}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async with ClientSession(timeout=ClientTimeout(total=timeout)) as session:
+        results = await asyncio.gather(*(process(session, paper_id, url) for paper_id, url in pdf_urls.items()))
+    return dict(zip(pdf_urls, results))
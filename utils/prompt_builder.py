@@ -0,0 +1,79 @@
+from typing import List
+
+# Rough token estimate for budgeting; Gemini averages ~4 characters per token
+CHARS_PER_TOKEN = 4
+
+ROLE_LABELS = {
+    "user": "User",
+    "assistant": "Assistant",
+    "tool_result": "Tool result",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_middle(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of an oversized text, dropping the middle."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    keep = max_chars // 2
+    omitted = len(text) - 2 * keep
+    return f"{text[:keep]}\n[... {omitted} characters truncated ...]\n{text[-keep:]}"
+
+
+class PromptBuilder:
+    """
+    Conversation history rendered once per message and assembled under a token budget.
+
+    The fixed prefix (instructions and tool manifest) is always included; the
+    oldest history lines are dropped first when the budget is exceeded.
+    """
+
+    def __init__(self, prefix: str, token_budget: int, tool_result_max_tokens: int):
+        self.prefix = prefix
+        self.token_budget = token_budget
+        self.tool_result_max_tokens = tool_result_max_tokens
+        self._lines: List[str] = []
+        self._tokens: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def add(self, role: str, content: str):
+        self.insert(len(self._lines), role, content)
+
+    def insert(self, index: int, role: str, content: str):
+        """Add a message at a given position, e.g. to file a query ahead of its tool steps."""
+        if role == "tool_result":
+            content = truncate_middle(content, self.tool_result_max_tokens)
+        line = f"{ROLE_LABELS[role]}: {content}"
+        self._lines.insert(index, line)
+        self._tokens.insert(index, estimate_tokens(line))
+
+    def truncate(self, length: int):
+        """Drop every message after the first `length`, e.g. the steps of a query that failed."""
+        del self._lines[length:]
+        del self._tokens[length:]
+
+    def build(self, query: str) -> str:
+        tail = f"User: {query}\nAssistant:"
+        remaining = self.token_budget - estimate_tokens(self.prefix) - estimate_tokens(tail)
+
+        # Walk back from the newest message until the budget is used up
+        first = len(self._lines)
+        while first > 0 and self._tokens[first - 1] <= remaining:
+            first -= 1
+            remaining -= self._tokens[first]
+
+        parts = [self.prefix]
+        if self._lines:
+            parts.append("Conversation history:")
+            if first > 0:
+                parts.append(f"[{first} earlier messages omitted to fit the context budget]")
+            parts.extend(self._lines[first:])
+            parts.append("")
+        parts.append(tail)
+        return "\n".join(parts)
@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_cache (
+    query_key TEXT PRIMARY KEY,
+    paper_ids TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_query_cache_last_used ON query_cache(last_used);
+"""
+
+
+def normalize_query(topic: str, max_results: int, sort_by: str = "relevance") -> str:
+    """Cache key for an ArXiv search: case- and whitespace-insensitive topic plus parameters."""
+    return f"{' '.join(topic.lower().split())}|{max_results}|{sort_by}"
+
+
+class QueryCache:
+    """Persistent TTL cache of ArXiv search results (paper ID lists)."""
+
+    def __init__(self, db_path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Kept out of the paper store so cache bookkeeping doesn't invalidate PaperCache
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return cached paper IDs for a query key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT paper_ids, fetched_at FROM query_cache WHERE query_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM query_cache WHERE query_key = ?", (key,))
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE query_cache SET last_used = ? WHERE query_key = ?", (now, key)
+            )
+            self._stats["hits"] += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, paper_ids: List[str]):
+        """Store a result list, evicting least recently used entries past max_entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_cache (query_key, paper_ids, fetched_at, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(paper_ids), now, now),
+                )
+                count = self._conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+                if count > self.max_entries:
+                    cursor = self._conn.execute(
+                        "DELETE FROM query_cache WHERE query_key IN ("
+                        "SELECT query_key FROM query_cache ORDER BY last_used LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+                    self._stats["evictions"] += cursor.rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["max_entries"] = self.max_entries
+        return stats
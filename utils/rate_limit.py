@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Block until tokens are available.
+
+        Args:
+            tokens: Number of tokens to take
+            timeout: Give up after this many seconds (None waits forever)
+
+        Returns:
+            True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for asyncio code.
+
+    Callers reserve tokens up front (the balance may go negative), so waiting
+    callers are served in arrival order without a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def available(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+
+    async def acquire(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> float:
+        """
+        Take tokens, sleeping until they have been refilled if necessary.
+
+        Args:
+            tokens: Number of tokens to take
+            max_wait: Reject instead of queueing if the wait would be longer
+                than this many seconds (None always queues)
+
+        Returns:
+            Seconds waited, or -1.0 if the request was rejected
+        """
+        wait = max(0.0, (tokens - self.available()) / self.rate)
+        if max_wait is not None and wait > max_wait:
+            return -1.0
+        self._tokens -= tokens
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def release(self, tokens: float):
+        """Give back tokens that were reserved but not used."""
+        self._tokens = min(self.capacity, self.available() + tokens)
@@ -0,0 +1,157 @@
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.text_index import tokenize
+
+# Only the highest-weighted terms of a paper are used to find its neighbours;
+# low-weight (common) terms have long posting lists and add little signal
+MAX_QUERY_TERMS = 32
+
+# The delta segment is merged into the base once it holds this fraction of all papers
+REBUILD_RATIO = 0.1
+
+
+def related_tokens(paper_data: Dict) -> List[str]:
+    """Tokens used for similarity: title and summary."""
+    return tokenize(f"{paper_data.get('title') or ''} {paper_data.get('summary') or ''}")
+
+
+class _Segment:
+    """Immutable L2-normalized TF-IDF matrix over a contiguous range of rows, in CSR and CSC form."""
+
+    def __init__(self, first_row: int, n_rows: int, rows: np.ndarray, cols: np.ndarray, tf: np.ndarray, idf: np.ndarray):
+        self.first_row = first_row
+        self.n_rows = n_rows
+
+        weights = (1.0 + np.log(tf)) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_rows))
+        norms[norms == 0] = 1.0
+        weights = (weights / norms[rows]).astype(np.float32)
+
+        # Rows arrive in order, so the COO arrays are already CSR-sorted
+        self.row_ptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n_rows))))
+        self.row_cols = cols
+        self.row_weights = weights
+
+        order = np.argsort(cols, kind="stable")
+        self.col_ptr = np.concatenate(([0], np.cumsum(np.bincount(cols, minlength=len(idf)))))
+        self.col_rows = rows[order]
+        self.col_weights = weights[order]
+
+    def row_vector(self, local_row: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.row_ptr[local_row], self.row_ptr[local_row + 1]
+        return self.row_cols[start:end], self.row_weights[start:end]
+
+    def scores(self, cols: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Dot product of the query vector with every row, as one gather + bincount."""
+        # Terms first seen after this segment was built have no postings in it
+        known = cols < len(self.col_ptr) - 1
+        cols, weights = cols[known], weights[known]
+        starts = self.col_ptr[cols]
+        lengths = self.col_ptr[cols + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(self.n_rows, dtype=np.float32)
+
+        # Flat indices of every posting of every query term
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        idx = np.arange(total) + offsets
+        contrib = self.col_weights[idx] * np.repeat(weights, lengths)
+        return np.bincount(self.col_rows[idx], weights=contrib, minlength=self.n_rows).astype(np.float32)
+
+
+class TfidfIndex:
+    """TF-IDF similarity index over papers, updated incrementally as papers are added."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._vocab: Dict[str, int] = {}
+        self._df: List[int] = []
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._doc_cols: List[np.ndarray] = []
+        self._doc_tf: List[np.ndarray] = []
+
+        self._base: Optional[_Segment] = None
+        self._delta: Optional[_Segment] = None
+        self._indexed_rows = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, paper_id: str) -> bool:
+        return paper_id in self._row_of
+
+    def add(self, paper_id: str, tokens: List[str]):
+        """Add a paper; papers already in the index are left unchanged."""
+        with self._lock:
+            if paper_id in self._row_of:
+                return
+            counts = Counter(tokens)
+            cols = np.empty(len(counts), dtype=np.int32)
+            tf = np.empty(len(counts), dtype=np.float32)
+            for i, (term, count) in enumerate(counts.items()):
+                col = self._vocab.get(term)
+                if col is None:
+                    col = self._vocab[term] = len(self._df)
+                    self._df.append(0)
+                self._df[col] += 1
+                cols[i] = col
+                tf[i] = count
+            self._row_of[paper_id] = len(self._ids)
+            self._ids.append(paper_id)
+            self._doc_cols.append(cols)
+            self._doc_tf.append(tf)
+
+    def _build(self, first_row: int) -> _Segment:
+        n_rows = len(self._ids) - first_row
+        lengths = [len(c) for c in self._doc_cols[first_row:]]
+        rows = np.repeat(np.arange(n_rows, dtype=np.int32), lengths)
+        cols = np.concatenate(self._doc_cols[first_row:]) if n_rows else np.empty(0, dtype=np.int32)
+        tf = np.concatenate(self._doc_tf[first_row:]) if n_rows else np.empty(0, dtype=np.float32)
+        n_docs = len(self._ids)
+        idf = np.log((1.0 + n_docs) / (1.0 + np.asarray(self._df, dtype=np.float64))) + 1.0
+        return _Segment(first_row, n_rows, rows, cols, tf, idf)
+
+    def _refresh(self):
+        """Fold newly added papers into the delta segment, or rebuild everything once it grows."""
+        n_docs = len(self._ids)
+        if self._indexed_rows == n_docs:
+            return
+        base_rows = self._base.n_rows if self._base else 0
+        if self._base is None or n_docs - base_rows > REBUILD_RATIO * n_docs:
+            self._base = self._build(0)
+            self._delta = None
+        else:
+            self._delta = self._build(base_rows)
+        self._indexed_rows = n_docs
+
+    def related(self, paper_id: str, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Return the k papers most similar to paper_id by cosine similarity.
+
+        Raises:
+            KeyError: If the paper is not in the index
+        """
+        with self._lock:
+            row = self._row_of[paper_id]
+            self._refresh()
+            segments = [s for s in (self._base, self._delta) if s is not None]
+
+            owner = next(s for s in segments if s.first_row <= row < s.first_row + s.n_rows)
+            cols, weights = owner.row_vector(row - owner.first_row)
+            if len(cols) > MAX_QUERY_TERMS:
+                top = np.argpartition(weights, -MAX_QUERY_TERMS)[-MAX_QUERY_TERMS:]
+                cols, weights = cols[top], weights[top]
+
+            scores = np.concatenate([s.scores(cols, weights) for s in segments])
+            scores[row] = -np.inf
+            k = min(k, len(scores) - 1)
+            if k <= 0:
+                return []
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            return [(self._ids[i], float(scores[i])) for i in top if scores[i] > 0]
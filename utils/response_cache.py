@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS response_cache (
+    cache_key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache(last_used);
+"""
+
+
+def response_key(model: str, prompt: str, params: Optional[Dict] = None) -> str:
+    """Content address of a generation request: SHA-256 over model, prompt and parameters."""
+    payload = json.dumps([model, prompt, params or {}], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache of model responses keyed by response_key().
+
+    A small in-memory LRU sits in front of a persistent SQLite store, so
+    repeated prompts are answered without a model call across restarts.
+    Any change to the prompt (such as a new tool result) changes the key.
+
+    get() and put() cover both tiers. Async callers use the memory-tier
+    methods on the event loop and run get_disk() and put_disk() in a
+    thread. The disk row count is tracked as rows are added and removed
+    rather than counted per put; with other processes writing to the same
+    file it is approximate, which only loosens the disk_entries bound.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        disk_entries: int = DEFAULT_DISK_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._disk_count = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "expired": 0, "evictions": 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None if missing or expired."""
+        response = self.get_memory(key)
+        return response if response is not None else self.get_disk(key)
+
+    def get_memory(self, key: str) -> Optional[str]:
+        """Memory-tier lookup; a miss isn't counted, since the disk tier is checked next."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.ttl_seconds:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return entry[0]
+
+    def get_disk(self, key: str) -> Optional[str]:
+        """Disk-tier lookup, promoting a hit to the memory tier. Blocking."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM response_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if now - row[1] > self.ttl_seconds:
+                cursor = self._conn.execute("DELETE FROM response_cache WHERE cache_key = ?", (key,))
+                self._disk_count -= cursor.rowcount
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE response_cache SET last_used = ? WHERE cache_key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            self._stats["disk_hits"] += 1
+            return row[0]
+
+    def contains(self, key: str) -> bool:
+        """Whether a key is in the memory tier (where every recent hit or put is), without counting a lookup."""
+        with self._lock:
+            entry = self._memory.get(key)
+        return entry is not None and time.time() - entry[1] <= self.ttl_seconds
+
+    def put(self, key: str, model: str, response: str):
+        """Store a response in both tiers."""
+        self.put_memory(key, response)
+        self.put_disk(key, model, response)
+
+    def put_memory(self, key: str, response: str):
+        with self._lock:
+            self._remember(key, response, time.time())
+
+    def put_disk(self, key: str, model: str, response: str):
+        """Store a response on disk, evicting least recently used entries past disk_entries. Blocking."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "UPDATE response_cache SET model = ?, response = ?, created_at = ?, last_used = ? "
+                    "WHERE cache_key = ?",
+                    (model, response, now, now, key),
+                )
+                added = 0
+                if cursor.rowcount == 0:
+                    self._conn.execute(
+                        "INSERT INTO response_cache (cache_key, model, response, created_at, last_used) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, model, response, now, now),
+                    )
+                    added = 1
+                evicted = 0
+                if self._disk_count + added > self.disk_entries:
+                    cursor = self._conn.execute(
+                        "DELETE FROM response_cache WHERE cache_key IN ("
+                        "SELECT cache_key FROM response_cache ORDER BY last_used LIMIT ?)",
+                        (self._disk_count + added - self.disk_entries,),
+                    )
+                    evicted = cursor.rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._disk_count += added - evicted
+            self._stats["evictions"] += evicted
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = self._disk_count
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import contextvars
+import functools
+import os
+import signal
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Optional
+
+from fastmcp import FastMCP
+from fastmcp.server.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from utils import telemetry
+
+TRANSPORTS = ("stdio", "http")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PATH = "/mcp"
+
+
+def parse_server_args(description: str, default_port: int) -> argparse.Namespace:
+    """
+    Transport options shared by the MCP servers.
+
+    stdio (the default) serves the single client that launched the process;
+    http serves any number of clients over streamable HTTP.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--transport", choices=TRANSPORTS, default=os.getenv("MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", DEFAULT_HOST), help="HTTP bind address")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", str(default_port))), help="HTTP port")
+    parser.add_argument("--path", default=os.getenv("MCP_PATH", DEFAULT_PATH), help="HTTP endpoint path")
+    return parser.parse_args()
+
+
+def offload(executor: Executor):
+    """
+    Decorator turning a blocking function into a coroutine run on `executor`,
+    so a tool doing file or network I/O doesn't stall the event loop. The
+    signature and docstring are kept for tool registration, and the caller's
+    context (e.g. the current trace span) is carried into the thread.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(executor, functools.partial(context.run, fn, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class TracingMiddleware(Middleware):
+    """Time every tool call as a span, continuing the caller's trace from the request metadata."""
+
+    async def on_call_tool(self, context, call_next):
+        if not telemetry.enabled():
+            return await call_next(context)
+        traceparent = None
+        try:
+            meta = context.fastmcp_context.request_context.meta
+            traceparent = getattr(meta, telemetry.TRACEPARENT_KEY, None) if meta is not None else None
+        except (AttributeError, LookupError, ValueError):
+            pass
+        with telemetry.continue_trace(traceparent):
+            with telemetry.span("tool.call", tool=context.message.name):
+                return await call_next(context)
+
+
+def install_telemetry(mcp: FastMCP):
+    """
+    Add tool call tracing plus two ways to read the metrics: the get_metrics
+    tool, and GET /metrics when serving over HTTP (Prometheus text format).
+    """
+    mcp.add_middleware(TracingMiddleware())
+
+    @mcp.tool()
+    def get_metrics() -> str:
+        """
+        Get this server's latency histograms (tool calls, upstream requests, storage and JSON work).
+
+        Returns:
+            Metrics in Prometheus text format; empty unless TELEMETRY_ENABLED=1
+        """
+        return telemetry.registry.render_prometheus()
+
+    @mcp.custom_route("/metrics", methods=["GET"])
+    async def metrics_endpoint(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(telemetry.registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def serve(mcp: FastMCP, args: argparse.Namespace, shutdown: Callable[[], Awaitable[None]],
+                startup: Optional[Callable[[], Awaitable[None]]] = None):
+    """
+    Await startup() if given, run the server on the selected transport until
+    the client goes away or the process is interrupted, then await
+    shutdown() to flush state.
+    """
+    try:
+        if startup is not None:
+            await startup()
+        if args.transport == "http":
+            # uvicorn handles SIGINT/SIGTERM itself and returns once connections have drained
+            await mcp.run_async(transport="http", host=args.host, port=args.port, path=args.path)
+        else:
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+            except (NotImplementedError, RuntimeError):
+                pass
+            await mcp.run_async(transport="stdio")
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await shutdown()
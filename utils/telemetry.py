@@ -0,0 +1,328 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow model turns
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+SPAN_METRIC = "span_duration_seconds"
+METRIC_PREFIX = "mcp_chatbot_"
+
+# Key under which trace context travels in MCP request metadata (W3C traceparent format)
+TRACEPARENT_KEY = "traceparent"
+
+_enabled = os.getenv("TELEMETRY_ENABLED", "0") != "0"
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(value: bool):
+    global _enabled
+    _enabled = value
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as exported to Prometheus."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound below which a fraction q of observations fall."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Histograms keyed by metric name and label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Count, mean and approximate percentiles per series, for JSON stats."""
+        with self._lock:
+            items = list(self._histograms.items())
+        result = {}
+        for (name, labels), histogram in sorted(items):
+            series = name + "".join(f"|{k}={v}" for k, v in labels)
+            result[series] = {
+                "count": histogram.count,
+                "mean_ms": round(1000 * histogram.sum / histogram.count, 3) if histogram.count else 0.0,
+                "p50_ms_le": 1000 * histogram.quantile(0.5),
+                "p95_ms_le": 1000 * histogram.quantile(0.95),
+                "p99_ms_le": 1000 * histogram.quantile(0.99),
+            }
+        return result
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+        lines = []
+        declared = set()
+        for (name, labels), histogram in items:
+            metric = METRIC_PREFIX + name
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum{{{label_text}}} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+# Span exporters receive one dict per finished span
+_exporters: List[Callable[[Dict], None]] = []
+
+
+def add_exporter(exporter: Callable[[Dict], None]):
+    _exporters.append(exporter)
+
+
+def remove_exporter(exporter: Callable[[Dict], None]):
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+
+class JsonLinesExporter:
+    """Write each finished span as one JSON line."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def __call__(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class _SpanContext:
+    """Trace and span IDs of a parent, local or received from another process."""
+
+    __slots__ = ("trace_id", "span_id")
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+
+_current: contextvars.ContextVar[Optional[_SpanContext]] = contextvars.ContextVar("telemetry_span", default=None)
+
+
+class Span(_SpanContext):
+    """
+    A timed operation. Used as a context manager it also becomes the parent
+    of spans started inside it (across awaits and copied thread contexts);
+    started with start_span() it is only timed, and must be ended with end().
+    """
+
+    __slots__ = ("name", "parent_id", "attributes", "start", "_started", "_token", "_ended")
+
+    def __init__(self, name: str, attributes: Dict):
+        parent = _current.get()
+        super().__init__(parent.trace_id if parent else secrets.token_hex(16), secrets.token_hex(8))
+        self.name = name
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = None
+        self._ended = False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None):
+        if self._ended:
+            return
+        self._ended = True
+        duration = time.perf_counter() - self._started
+        status = "ok" if error is None else "error"
+        registry.observe(SPAN_METRIC, duration, span=self.name, status=status)
+        if _exporters:
+            record = {
+                "name": self.name,
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "start": round(self.start, 6),
+                "duration_ms": round(duration * 1000, 3),
+                "status": status,
+            }
+            if error is not None:
+                record["error"] = f"{type(error).__name__}: {error}"
+            if self.attributes:
+                record["attributes"] = self.attributes
+            for exporter in list(_exporters):
+                try:
+                    exporter(record)
+                except Exception as e:
+                    print(f"Telemetry exporter failed: {e}", file=sys.stderr)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.end(exc)
+        return False
+
+
+class _NoopSpan:
+    """Stand-in returned while telemetry is disabled; every operation does nothing."""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, error: Optional[BaseException] = None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Context manager timing a block as a child of the current span."""
+    if not _enabled:
+        return NOOP_SPAN
+    return Span(name, attributes)
+
+
+def start_span(name: str, **attributes):
+    """
+    Start a span without making it current, for work that is suspended and
+    resumed (e.g. async generators); call end() when done.
+    """
+    if not _enabled:
+        return NOOP_SPAN
+    return Span(name, attributes)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator wrapping every call of a function (sync or async) in a span."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                with Span(span_name, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_meta() -> Optional[Dict[str, str]]:
+    """Request metadata carrying the current trace context to another process, or None."""
+    current = _current.get() if _enabled else None
+    if current is None:
+        return None
+    return {TRACEPARENT_KEY: f"00-{current.trace_id}-{current.span_id}-01"}
+
+
+class continue_trace:
+    """Make a received traceparent the parent of spans started inside the block."""
+
+    def __init__(self, traceparent: Optional[str]):
+        self.parent = None
+        if _enabled and traceparent:
+            parts = traceparent.split("-")
+            if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+                self.parent = _SpanContext(parts[1], parts[2])
+        self._token = None
+
+    def __enter__(self):
+        if self.parent is not None:
+            self._token = _current.set(self.parent)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            _current.reset(self._token)
+        return False
+
+
+def configure_from_env():
+    """
+    Attach the JSON span log named by TELEMETRY_LOG: "-" for stderr (stdout
+    carries the stdio MCP transport) or a file path to append to.
+    """
+    target = os.getenv("TELEMETRY_LOG")
+    if not _enabled or not target:
+        return
+    stream = sys.stderr if target == "-" else open(target, "a", encoding="utf-8")
+    add_exporter(JsonLinesExporter(stream))
+
+
+configure_from_env()
@@ -0,0 +1,95 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Common words that carry no signal for paper search
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which with we our using via".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens with stopwords removed."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def paper_tokens(paper_data: Dict) -> List[str]:
+    """Tokens indexed for a paper: title, summary and author names."""
+    parts = [
+        paper_data.get("title") or "",
+        paper_data.get("summary") or "",
+        " ".join(paper_data.get("authors") or []),
+    ]
+    return tokenize(" ".join(parts))
+
+
+class BM25Index:
+    """Incrementally maintained inverted index with Okapi BM25 ranking."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_len
+
+    def add(self, doc_id: str, tokens: List[str]):
+        """Index a document; re-adding an existing ID replaces it."""
+        with self._lock:
+            if doc_id in self._doc_len:
+                self.remove(doc_id)
+            for term, tf in Counter(tokens).items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_len[doc_id] = len(tokens)
+            self._total_len += len(tokens)
+
+    def add_many(self, docs: Iterable[Tuple[str, List[str]]]):
+        with self._lock:
+            for doc_id, tokens in docs:
+                self.add(doc_id, tokens)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            length = self._doc_len.pop(doc_id, None)
+            if length is None:
+                return
+            self._total_len -= length
+            for term in list(self._postings):
+                postings = self._postings[term]
+                if postings.pop(doc_id, None) is not None and not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to k (doc_id, score) pairs, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not terms or not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
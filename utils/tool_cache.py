@@ -0,0 +1,121 @@
+import json
+import math
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from utils.singleflight import SingleFlight
+from utils.ttl_cache import MISSING, TTLCache
+
+DEFAULT_MAX_ENTRIES = 256
+
+# Policy values accepted in the "toolCache" config section
+POLICY_NEVER = "never"
+POLICY_SESSION = "session"
+
+# Tools report failures and misses as ordinary text; results starting with
+# these may change once the missing data has been fetched, so they aren't kept
+UNCACHEABLE_PREFIXES = ("Error", "No information found", "No saved papers", "No related papers found")
+
+
+def canonical_args(tool_args: Optional[Dict]) -> str:
+    """Stable text form of tool arguments, independent of key order and spacing."""
+    return json.dumps(tool_args or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def is_cacheable_result(result) -> bool:
+    """Whether an MCP tool result is a success worth memoizing: not isError and not a failure message."""
+    if getattr(result, "isError", False):
+        return False
+    text = "".join(getattr(item, "text", "") for item in getattr(result, "content", None) or [])
+    return not text.lstrip().startswith(UNCACHEABLE_PREFIXES)
+
+
+def parse_policy(policy: Any) -> Optional[float]:
+    """
+    Turn a policy into a TTL in seconds: "never" -> None (don't cache),
+    "session" -> infinite, a number -> that many seconds.
+    """
+    if policy == POLICY_NEVER:
+        return None
+    if policy == POLICY_SESSION:
+        return math.inf
+    if isinstance(policy, (int, float)) and not isinstance(policy, bool) and policy > 0:
+        return float(policy)
+    raise ValueError(f"Invalid tool cache policy {policy!r}; use 'never', 'session' or a TTL in seconds")
+
+
+def load_tool_cache_config(path: str) -> Dict:
+    """Read the optional "toolCache" section of a server config file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("toolCache", {})
+
+
+class ToolResultCache:
+    """
+    Memoized tool results for one chat session, keyed on tool name and canonical arguments.
+
+    Each tool has a policy (never cache, cache for a TTL, or cache for the
+    rest of the session); tools without one use the default policy.
+    Concurrent identical calls share a single in-flight request.
+    """
+
+    def __init__(self, policies: Dict[str, Any] = None, default_policy: Any = POLICY_NEVER,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttls = {name: parse_policy(policy) for name, policy in (policies or {}).items()}
+        self.default_ttl = parse_policy(default_policy)
+        self._cache = TTLCache(ttl_seconds=math.inf, max_entries=max_entries)
+        self._singleflight = SingleFlight()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ToolResultCache":
+        return cls(
+            policies=config.get("tools"),
+            default_policy=config.get("default", POLICY_NEVER),
+            max_entries=config.get("maxEntries", DEFAULT_MAX_ENTRIES),
+        )
+
+    def ttl_for(self, tool_name: str) -> Optional[float]:
+        return self.ttls.get(tool_name, self.default_ttl)
+
+    async def call(
+        self,
+        tool_name: str,
+        tool_args: Dict,
+        fn: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda result: True,
+    ) -> Tuple[Any, bool]:
+        """
+        Return (result, reused) for a tool call, running fn() only on a miss.
+
+        Results rejected by `cacheable` (e.g. tool errors) are returned but not stored.
+        """
+        ttl = self.ttl_for(tool_name)
+        if ttl is None:
+            return await fn(), False
+
+        key = (tool_name, canonical_args(tool_args))
+        result = self._cache.get(key)
+        if result is not MISSING:
+            return result, True
+
+        ran = False
+
+        async def run():
+            nonlocal ran
+            ran = True
+            result = await fn()
+            if cacheable(result):
+                self._cache.set(key, result, ttl_seconds=ttl)
+            return result
+
+        result = await self._singleflight.do(key, run)
+        # run() only executes for the caller that started the request; others shared it
+        return result, not ran
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        stats = self._cache.stats()
+        del stats["ttl_seconds"]
+        stats["coalesced"] = self._singleflight.coalesced
+        return stats
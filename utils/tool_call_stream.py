@@ -0,0 +1,127 @@
+import json
+from typing import Dict, List, Optional
+
+WHITESPACE = " \t\r\n"
+
+
+def as_tool_call(item) -> Optional[Dict]:
+    """Return the tool call described by a parsed JSON value, or None if it isn't one."""
+    if isinstance(item, dict) and item.get("action") == "tool_call":
+        return {
+            "tool_name": item.get("tool_name"),
+            "tool_args": item.get("tool_args") or {},
+        }
+    return None
+
+
+class ToolCallDetector:
+    """
+    Incremental tool call detection on streamed model output.
+
+    Feed chunks as they arrive; each tool call object is returned from feed()
+    as soon as its closing brace is seen, and `done` is set once nothing more
+    of the response is needed. Output that can't be a tool call switches the
+    detector to text mode, after which further chunks are ignored.
+    """
+
+    def __init__(self, max_calls: int):
+        self.max_calls = max_calls
+        self.mode: Optional[str] = None  # None, "object", "list", "text" or "done"
+        self.calls: List[Dict] = []
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = 0  # buffer offset of the object being scanned
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+
+    @property
+    def done(self) -> bool:
+        return self.mode == "done"
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk and return the tool calls it completed."""
+        if self.mode in ("text", "done"):
+            return []
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and self.mode not in ("text", "done"):
+            char = buffer[self._pos]
+            call = self._step(char)
+            if call is not None:
+                completed.append(call)
+            self._pos += 1
+        return completed
+
+    def _stop(self):
+        # Calls already found stand; otherwise this wasn't a tool call response
+        self.mode = "done" if self.calls else "text"
+
+    def _complete(self, end: int) -> Optional[Dict]:
+        try:
+            call = as_tool_call(json.loads(self._buffer[self._start:end]))
+        except json.JSONDecodeError:
+            call = None
+        if call is None:
+            self._stop()
+            return None
+        self.calls.append(call)
+        if self.mode == "object" or len(self.calls) >= self.max_calls:
+            self.mode = "done"
+        return call
+
+    def _step(self, char: str) -> Optional[Dict]:
+        if self.mode is None:
+            if char in WHITESPACE:
+                return None
+            if char == "{":
+                self.mode = "object"
+                self._start = self._pos
+                self._depth = 1
+                self._expect_key = True
+            elif char == "[":
+                self.mode = "list"
+            else:
+                self.mode = "text"
+            return None
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+            return None
+
+        if self._expect_key and char not in WHITESPACE:
+            # An object must open with a key or close straight away
+            self._expect_key = False
+            if char not in '"}':
+                self._stop()
+                return None
+
+        if self.mode == "list" and self._depth == 0:
+            # Between list elements only objects, commas and the closing bracket may appear
+            if char == "{":
+                self._start = self._pos
+                self._depth = 1
+                self._expect_key = True
+            elif char == "]":
+                self._stop()
+            elif char not in WHITESPACE and char != ",":
+                self._stop()
+            return None
+
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._depth += 1
+            self._expect_key = char == "{"
+        elif char in "}]":
+            self._depth -= 1
+            if self._depth == 0:
+                return self._complete(self._pos + 1)
+        return None
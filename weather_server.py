@@ -1,142 +1,386 @@
 import os
+import sys
 import json
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from fastmcp import FastMCP
 from dotenv import load_dotenv
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
 import asyncio
 
+from utils.rate_limit import AsyncTokenBucket
+from utils.server_runner import install_telemetry, parse_server_args, serve
+from utils.singleflight import SingleFlight
+from utils.telemetry import span
+from utils.ttl_cache import MISSING, TTLCache
+
 # Load environment variables
 load_dotenv()
 
-# Initialize FastMCP
-mcp = FastMCP("mcp-weather")
-
 # Cache configuration
 CACHE_DIR = Path.home() / ".cache" / "weather"
 LOCATION_CACHE_FILE = CACHE_DIR / "location_cache.json"
+LOCATION_FLUSH_DELAY = float(os.getenv("WEATHER_LOCATION_FLUSH_DELAY", "1"))
+
+# Response cache configuration; conditions change faster than the hourly forecast
+CURRENT_CONDITIONS_TTL = float(os.getenv("WEATHER_CURRENT_CONDITIONS_TTL", "600"))
+FORECAST_TTL = float(os.getenv("WEATHER_FORECAST_TTL", "1800"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+_location_cache: Optional[Dict[str, Dict]] = None
+_location_cache_dirty = False
+_location_flush_task: Optional[asyncio.Task] = None
+_location_flush_lock = asyncio.Lock()
+_current_conditions_cache = TTLCache(CURRENT_CONDITIONS_TTL, RESPONSE_CACHE_MAX_ENTRIES)
+_forecast_cache = TTLCache(FORECAST_TTL, RESPONSE_CACHE_MAX_ENTRIES)
+
+# AccuWeather configuration
+ACCUWEATHER_BASE_URL = os.getenv("ACCUWEATHER_BASE_URL", "http://dataservice.accuweather.com")
+BATCH_MAX_LOCATIONS = 10
+BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", "4"))
+
+# Upstream quota: the daily budget refills continuously; requests queue for up
+# to QUOTA_MAX_WAIT seconds when it is spent and are rejected beyond that
+QUOTA_PER_DAY = float(os.getenv("ACCUWEATHER_QUOTA_PER_DAY", "50"))
+QUOTA_MAX_WAIT = float(os.getenv("ACCUWEATHER_QUOTA_MAX_WAIT", "5"))
+
+_quota = AsyncTokenBucket(QUOTA_PER_DAY / 86400, QUOTA_PER_DAY)
+_singleflight = SingleFlight()
+_upstream_stats = {"upstream_calls": 0, "throttled": 0, "rejected": 0, "errors": 0}
+
+# HTTP connection pool configuration
+HTTP_MAX_CONNECTIONS = int(os.getenv("WEATHER_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("WEATHER_HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("WEATHER_HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("WEATHER_HTTP_DNS_CACHE_TTL", "300"))
+HTTP_TIMEOUT = float(os.getenv("WEATHER_HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("WEATHER_HTTP_CONNECT_TIMEOUT", "5"))
+
+# Port for the MCP server's own HTTP transport
+MCP_HTTP_PORT = 8002
+
+_http_session: Optional[ClientSession] = None
+
+def get_http_session() -> ClientSession:
+    """Return the server-wide pooled HTTP session, creating it on first use."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = TCPConnector(
+            limit=HTTP_MAX_CONNECTIONS,
+            limit_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        )
+        _http_session = ClientSession(
+            connector=connector,
+            timeout=ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+    return _http_session
+
+async def close_http_session():
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+async def startup():
+    """Open the pooled HTTP session before the first tool call arrives."""
+    get_http_session()
+
+async def shutdown():
+    """Flush the location cache and close the pooled HTTP session when the server stops."""
+    if _location_flush_task is not None:
+        _location_flush_task.cancel()
+    await flush_location_cache()
+    await close_http_session()
 
-def get_cached_location_key(location: str) -> Optional[str]:
-    """Get location key from cache."""
+# Initialize FastMCP
+mcp = FastMCP("mcp-weather")
+
+def _load_location_cache() -> Dict[str, Dict]:
     if not LOCATION_CACHE_FILE.exists():
-        return None
+        return {}
     
     try:
-        with open(LOCATION_CACHE_FILE, "r") as f:
+        with span("json.load", file="location_cache"), open(LOCATION_CACHE_FILE, "r") as f:
             cache = json.load(f)
-            return cache.get(location)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return None
+    except (json.JSONDecodeError, FileNotFoundError) as e:
+        print(f"Warning: Ignoring unreadable location cache: {e}", file=sys.stderr)
+        return {}
+    
+    # Older cache files stored only the location key
+    return {
+        location: {"key": entry, "name": location, "country": None} if isinstance(entry, str) else entry
+        for location, entry in cache.items()
+    }
 
-def cache_location_key(location: str, location_key: str):
-    """Cache location key for future use."""
+def get_cached_location_key(location: str) -> Optional[Dict]:
+    """Get location info (key, name, country) from the in-memory cache."""
+    global _location_cache
+    if _location_cache is None:
+        _location_cache = _load_location_cache()
+    return _location_cache.get(location)
+
+def _write_location_cache(cache: Dict[str, Dict]):
+    """Write the location cache via a temp file and atomic rename."""
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Per-process temp name: pooled server processes share the cache file
+    tmp_path = LOCATION_CACHE_FILE.with_suffix(f".json.{os.getpid()}.tmp")
+    with span("json.dump", file="location_cache"):
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, LOCATION_CACHE_FILE)
+
+async def flush_location_cache():
+    """Persist pending location cache changes without blocking the event loop."""
+    global _location_cache_dirty
+    async with _location_flush_lock:
+        if not _location_cache_dirty or _location_cache is None:
+            return
+        _location_cache_dirty = False
+        try:
+            await asyncio.to_thread(_write_location_cache, dict(_location_cache))
+        except Exception as e:
+            _location_cache_dirty = True
+            print(f"Warning: Failed to cache location key: {e}", file=sys.stderr)
+
+async def _flush_location_cache_later():
+    global _location_flush_task
+    try:
+        await asyncio.sleep(LOCATION_FLUSH_DELAY)
+        await flush_location_cache()
+    finally:
+        _location_flush_task = None
+
+def cache_location_key(location: str, location_info: Dict):
+    """Cache location info; the file is written behind by a background flush."""
+    global _location_cache, _location_cache_dirty, _location_flush_task
+    if _location_cache is None:
+        _location_cache = _load_location_cache()
+    _location_cache[location] = location_info
+    _location_cache_dirty = True
     
+    # Coalesce writes from a burst of lookups into one flush
+    if _location_flush_task is None:
+        _location_flush_task = asyncio.get_running_loop().create_task(_flush_location_cache_later())
+
+class QuotaReservation:
+    """Upstream calls one weather request has paid for up front."""
+
+    def __init__(self, tokens: float):
+        self.tokens = tokens
+
+    def release(self):
+        """Return calls that turned out not to be needed (cache hits, coalesced requests)."""
+        if self.tokens > 0:
+            _quota.release(self.tokens)
+            self.tokens = 0
+
+async def _acquire_quota(tokens: float, what: str) -> float:
+    waited = await _quota.acquire(tokens, max_wait=QUOTA_MAX_WAIT)
+    if waited < 0:
+        _upstream_stats["rejected"] += 1
+        raise Exception(f"AccuWeather quota budget exhausted; not fetching {what}. Try again later.")
+    if waited > 0:
+        _upstream_stats["throttled"] += 1
+    return waited
+
+async def reserve_quota(tokens: int, what: str) -> QuotaReservation:
+    """
+    Take the quota for all of a request's upstream calls at once, so a request
+    is either rejected before its first call or can make all of them.
+    """
+    if tokens > 0:
+        with span("accuweather.quota", tokens=tokens) as quota_span:
+            waited = await _acquire_quota(tokens, what)
+            quota_span.set(wait_ms=round(waited * 1000, 1))
+    return QuotaReservation(tokens)
+
+async def _fetch_upstream(url: str, params: Dict, what: str, reservation: QuotaReservation):
+    waited = 0.0
+    if reservation.tokens > 0:
+        reservation.tokens -= 1
+    else:
+        # A cached response expired after the request was costed
+        waited = await _acquire_quota(1, what)
+    
+    _upstream_stats["upstream_calls"] += 1
+    session = get_http_session()
+    with span("accuweather.request", what=what, quota_wait_ms=round(waited * 1000, 1)) as request_span:
+        async with session.get(url, params=params) as response:
+            request_span.set(status=response.status)
+            data = await response.json()
+            if response.status != 200:
+                _upstream_stats["errors"] += 1
+                raise Exception(f"Error fetching {what}: {response.status}, {data}")
+            return data
+
+async def _get_json(url: str, params: Dict, what: str, reservation: QuotaReservation):
+    # Identical concurrent requests share one upstream call, paid for by the caller that makes it
+    key = (url, tuple(sorted((k, v) for k, v in params.items() if k != "apikey")))
+    return await _singleflight.do(key, lambda: _fetch_upstream(url, params, what, reservation))
+
+async def resolve_location(location: str, reservation: QuotaReservation) -> Dict:
+    """Resolve a location name to its AccuWeather key, name and country."""
+    # Try to get location key from cache first
+    location_info = get_cached_location_key(location)
+    if location_info:
+        return location_info
+    
+    locations = await _get_json(
+        f"{ACCUWEATHER_BASE_URL}/locations/v1/cities/search",
+        {"apikey": os.getenv("ACCUWEATHER_API_KEY"), "q": location},
+        "location data",
+        reservation,
+    )
+    if not locations or len(locations) == 0:
+        raise Exception("Location not found")
+    
+    location_info = {
+        "key": locations[0]["Key"],
+        "name": locations[0]["LocalizedName"],
+        "country": locations[0]["Country"]["LocalizedName"],
+    }
+    # Cache the location key for future use
+    cache_location_key(location, location_info)
+    return location_info
+
+async def fetch_current_conditions(location_key: str, reservation: QuotaReservation):
+    current_conditions = _current_conditions_cache.get(location_key)
+    if current_conditions is MISSING:
+        current_conditions = await _get_json(
+            f"{ACCUWEATHER_BASE_URL}/currentconditions/v1/{location_key}",
+            {"apikey": os.getenv("ACCUWEATHER_API_KEY")},
+            "current conditions",
+            reservation,
+        )
+        _current_conditions_cache.set(location_key, current_conditions)
+    return current_conditions
+
+async def fetch_hourly_forecast(location_key: str, reservation: QuotaReservation):
+    forecast = _forecast_cache.get(location_key)
+    if forecast is MISSING:
+        forecast = await _get_json(
+            f"{ACCUWEATHER_BASE_URL}/forecasts/v1/hourly/12hour/{location_key}",
+            {"apikey": os.getenv("ACCUWEATHER_API_KEY"), "metric": "true"},
+            "hourly forecast",
+            reservation,
+        )
+        _forecast_cache.set(location_key, forecast)
+    return forecast
+
+def _upstream_calls_needed(location: str) -> int:
+    """Upstream calls a weather request for this location will make, judging by what is cached."""
+    location_info = get_cached_location_key(location)
+    if location_info is None:
+        return 3
+    key = location_info["key"]
+    return int(not _current_conditions_cache.contains(key)) + int(not _forecast_cache.contains(key))
+
+def format_weather(location_info: Dict, current_conditions, forecast) -> Dict:
+    # Format response
+    hourly_data = []
+    for i, hour in enumerate(forecast, 1):
+        hourly_data.append({
+            "relative_time": f"+{i} hour{'s' if i > 1 else ''}",
+            "temperature": {
+                "value": hour["Temperature"]["Value"],
+                "unit": hour["Temperature"]["Unit"]
+            },
+            "weather_text": hour["IconPhrase"],
+            "precipitation_probability": hour["PrecipitationProbability"],
+            "precipitation_type": hour.get("PrecipitationType"),
+            "precipitation_intensity": hour.get("PrecipitationIntensity"),
+        })
+    
+    # Format current conditions
+    if current_conditions and len(current_conditions) > 0:
+        current = current_conditions[0]
+        current_data = {
+            "temperature": {
+                "value": current["Temperature"]["Metric"]["Value"],
+                "unit": current["Temperature"]["Metric"]["Unit"]
+            },
+            "weather_text": current["WeatherText"],
+            "relative_humidity": current.get("RelativeHumidity"),
+            "precipitation": current.get("HasPrecipitation", False),
+            "observation_time": current["LocalObservationDateTime"]
+        }
+    else:
+        current_data = "No current conditions available"
+    
+    return {
+        "location": location_info["name"],
+        "location_key": location_info["key"],
+        "country": location_info["country"],
+        "current_conditions": current_data,
+        "hourly_forecast": hourly_data
+    }
+
+async def fetch_hourly_weather(location: str) -> Dict:
+    reservation = await reserve_quota(_upstream_calls_needed(location), f"weather for {location}")
     try:
-        if LOCATION_CACHE_FILE.exists():
-            with open(LOCATION_CACHE_FILE, "r") as f:
-                cache = json.load(f)
-        else:
-            cache = {}
+        location_info = await resolve_location(location, reservation)
         
-        cache[location] = location_key
-        
-        with open(LOCATION_CACHE_FILE, "w") as f:
-            json.dump(cache, f, indent=2)
-    except Exception as e:
-        print(f"Warning: Failed to cache location key: {e}")
+        # Current conditions and forecast are independent; fetch them together
+        current_conditions, forecast = await asyncio.gather(
+            fetch_current_conditions(location_info["key"], reservation),
+            fetch_hourly_forecast(location_info["key"], reservation),
+        )
+    finally:
+        reservation.release()
+    return format_weather(location_info, current_conditions, forecast)
 
 @mcp.tool()
 async def get_hourly_weather(location: str) -> Dict:
     """Get hourly weather forecast for a location."""
-    api_key = os.getenv("ACCUWEATHER_API_KEY")
-    base_url = "http://dataservice.accuweather.com"
+    return await fetch_hourly_weather(location)
+
+@mcp.tool()
+async def get_hourly_weather_batch(locations: List[str]) -> Dict:
+    """Get hourly weather forecasts for several locations (up to 10) at once."""
+    locations = list(dict.fromkeys(l.strip() for l in locations if l and l.strip()))
+    if not locations:
+        raise Exception("At least one location is required")
+    if len(locations) > BATCH_MAX_LOCATIONS:
+        raise Exception(f"At most {BATCH_MAX_LOCATIONS} locations can be requested at once")
     
-    # Try to get location key from cache first
-    location_key = get_cached_location_key(location)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
     
-    async with ClientSession() as session:
-        if not location_key:
-            location_search_url = f"{base_url}/locations/v1/cities/search"
-            params = {
-                "apikey": api_key,
-                "q": location,
-            }
-            async with session.get(location_search_url, params=params) as response:
-                locations = await response.json()
-                if response.status != 200:
-                    raise Exception(f"Error fetching location data: {response.status}, {locations}")
-                if not locations or len(locations) == 0:
-                    raise Exception("Location not found")
-            
-            location_key = locations[0]["Key"]
-            # Cache the location key for future use
-            cache_location_key(location, location_key)
-        
-        # Get current conditions
-        current_conditions_url = f"{base_url}/currentconditions/v1/{location_key}"
-        params = {
-            "apikey": api_key,
-        }
-        async with session.get(current_conditions_url, params=params) as response:
-            current_conditions = await response.json()
-            
-        # Get hourly forecast
-        forecast_url = f"{base_url}/forecasts/v1/hourly/12hour/{location_key}"
-        params = {
-            "apikey": api_key,
-            "metric": "true",
-        }
-        async with session.get(forecast_url, params=params) as response:
-            forecast = await response.json()
-        
-        # Format response
-        hourly_data = []
-        for i, hour in enumerate(forecast, 1):
-            hourly_data.append({
-                "relative_time": f"+{i} hour{'s' if i > 1 else ''}",
-                "temperature": {
-                    "value": hour["Temperature"]["Value"],
-                    "unit": hour["Temperature"]["Unit"]
-                },
-                "weather_text": hour["IconPhrase"],
-                "precipitation_probability": hour["PrecipitationProbability"],
-                "precipitation_type": hour.get("PrecipitationType"),
-                "precipitation_intensity": hour.get("PrecipitationIntensity"),
-            })
-        
-        # Format current conditions
-        if current_conditions and len(current_conditions) > 0:
-            current = current_conditions[0]
-            current_data = {
-                "temperature": {
-                    "value": current["Temperature"]["Metric"]["Value"],
-                    "unit": current["Temperature"]["Metric"]["Unit"]
-                },
-                "weather_text": current["WeatherText"],
-                "relative_humidity": current.get("RelativeHumidity"),
-                "precipitation": current.get("HasPrecipitation", False),
-                "observation_time": current["LocalObservationDateTime"]
-            }
-        else:
-            current_data = "No current conditions available"
-        
-        return {
-            "location": locations[0]["LocalizedName"],
-            "location_key": location_key,
-            "country": locations[0]["Country"]["LocalizedName"],
-            "current_conditions": current_data,
-            "hourly_forecast": hourly_data
-        } 
-
-# Add this at the end of your weather server file:
+    async def fetch_one(location: str) -> Dict:
+        async with semaphore:
+            try:
+                return await fetch_hourly_weather(location)
+            except Exception as e:
+                return {"error": str(e)}
+    
+    results = await asyncio.gather(*(fetch_one(location) for location in locations))
+    return dict(zip(locations, results))
+
+@mcp.tool()
+async def get_weather_stats() -> Dict:
+    """Get upstream call, coalescing, quota and cache counters for the weather server."""
+    return {
+        **_upstream_stats,
+        "coalesced": _singleflight.coalesced,
+        "in_flight": _singleflight.in_flight(),
+        "quota_remaining": round(_quota.available(), 2),
+        "quota_per_day": QUOTA_PER_DAY,
+        "current_conditions_cache": _current_conditions_cache.stats(),
+        "forecast_cache": _forecast_cache.stats(),
+    }
+
+install_telemetry(mcp)
+
 def main():
-    print("Starting Weather MCP Server...")
+    args = parse_server_args("Weather MCP Server", MCP_HTTP_PORT)
+    print("Starting Weather MCP Server...", file=sys.stderr)
     try:
-        mcp.run(transport='stdio')
+        asyncio.run(serve(mcp, args, shutdown, startup))
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
-        print(f"Error running server: {e}")
+        print(f"Error running server: {e}", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file